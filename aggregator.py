@@ -1,63 +1,430 @@
+from collections import deque
 from datetime import datetime
+from types import MappingProxyType
+import logging
 import threading
+import time
+
+from events import SymbolTable
+from instrumentation import METRICS
+from rolling import RollingDamage
+from skill_map import SKILL_TO_CLASS
+
+log = logging.getLogger(__name__)
+
+_RESET = object()  # queued by reset() so the writer drops everything before it
+
+EMPTY_STATS = MappingProxyType({})
+
+# Slots of the counter lists kept per skill and per target
+DAMAGE, HITS, CRITS, HIGHEST = range(4)
+
+
+class ActorStats:
+    __slots__ = ("total_damage", "events", "crit_events", "start_time", "class_name", "highest_hit",
+                 "skills", "targets", "rolling", "rolled_damage", "start_datetime")
+
+    def __init__(self, start_time, rolling, class_name=None):
+        self.total_damage = 0
+        self.events = 0
+        self.crit_events = 0
+        self.start_time = start_time  # time.time() of the actor's first event
+        self.start_datetime = datetime.fromtimestamp(start_time)
+        self.class_name = class_name
+        self.highest_hit = 0
+        # skill id / target id -> [damage, hits, crits, highest hit], updated in place
+        self.skills = {}
+        self.targets = {}
+        self.rolling = rolling
+        self.rolled_damage = 0  # part of total_damage already fed to `rolling`
+
+    def as_dict(self):
+        stats = {
+            "total_damage": self.total_damage,
+            "events": self.events,
+            "crit_events": self.crit_events,
+            "start_time": self.start_datetime,
+            "class": self.class_name,
+            "highest_hit": self.highest_hit,
+        }
+        self.rolling.fill_stats(stats)
+        return stats
+
+
+class StatsSnapshot:
+    # Published by the writer and never modified afterwards. `stats` maps actor
+    # name -> stats dict; readers must treat those dicts as read-only too.
+    # newest_hit is the time.time() stamp of the latest hit included, encounter
+    # the id of the encounter the stats belong to.
+    __slots__ = ("version", "stats", "global_start_time", "newest_hit", "encounter")
+
+    def __init__(self, version, stats, global_start_time, newest_hit=None, encounter=0):
+        self.version = version
+        self.stats = stats
+        self.global_start_time = global_start_time
+        self.newest_hit = newest_hit
+        self.encounter = encounter
+
+
+class EncounterSummary:
+    # A finished encounter, frozen when it closed. `stats` maps actor name ->
+    # read-only dict with the same keys as the live snapshot plus "dps" and the
+    # "skills"/"targets" breakdown rows, so browsing history never re-aggregates.
+    __slots__ = ("id", "start_time", "end_time", "duration", "total_damage", "stats")
+
+    def __init__(self, encounter_id, start_time, end_time, stats):
+        self.id = encounter_id
+        self.start_time = start_time  # time.time() stamps of the first and last hit
+        self.end_time = end_time
+        self.duration = max(1.0, end_time - start_time)
+        self.total_damage = sum(data["total_damage"] for data in stats.values())
+        self.stats = stats
+
 
 class Aggregator:
-    def __init__(self):
-        self.stats = {}
-        self.seen_lines = set()
-        self.lock = threading.Lock()
-        self.global_start_time = None
+    # Producers queue work with submit()/update()/set_actor_class(); a single
+    # writer (the worker thread) applies it in batches with flush() and publishes
+    # a fresh StatsSnapshot. Readers just grab the current snapshot, no locking.
+    #
+    # Hits are split into encounters by their timestamps: once nothing landed
+    # for `idle_gap` seconds the encounter is frozen into an EncounterSummary.
+    # Its stats stay on display until the next hit opens a new encounter.
+    def __init__(self, symbols=None, bucket_size=0.1, rolling_windows=(5, 10, 30), idle_gap=30.0,
+                 history_size=50):
+        # Must be the same table the parser interns into
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.bucket_size = bucket_size
+        self.rolling_windows = rolling_windows
+        self.stats = {}  # actor id -> ActorStats, owned by the writer
+        self.start_timestamp = None
+        self.newest_hit = None
+        self.skill_classes = {}  # skill id -> class guessed from SKILL_TO_CLASS, or None
+        # actor id -> class from set_actor_class. Kept across encounters, so a
+        # class set between fights still applies to the actor's next one.
+        self.actor_classes = {}
+        self.pending = deque()
+        self.dirty = set()  # actor ids changed since the last published snapshot
+
+        # Encounter segmentation, owned by the writer. `encounters` is replaced
+        # (never mutated) so any thread can read it.
+        self.idle_gap = idle_gap
+        self.history_size = history_size
+        self.encounter_id = 0
+        self.encounter_open = False
+        self.encounters = ()
+        self.fresh_snapshot = False  # next publish must not carry over the previous encounter's actors
+        self.force_publish = False
+
+        # Only reset() and the writer's publish step ever take this
+        self.publish_lock = threading.Lock()
+        self.resets_requested = 0
+        self.resets_applied = 0
+        self.snapshot = StatsSnapshot(0, EMPTY_STATS, None)
+        self.listeners = []
+        self.encounter_listeners = []
+
+    @property
+    def global_start_time(self):
+        return self.snapshot.global_start_time
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def add_listener(self, callback):
+        # callback(snapshot) runs right after every new snapshot, on the writer
+        # thread (or whichever thread called reset()). Keep it short and don't
+        # touch Tk from it.
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self, snapshot):
+        for callback in list(self.listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                log.exception("Stats listener failed: %s", e)
+
+    def add_encounter_listener(self, callback):
+        # callback(summary) runs on the writer thread whenever an encounter closes
+        self.encounter_listeners.append(callback)
+
+    def remove_encounter_listener(self, callback):
+        if callback in self.encounter_listeners:
+            self.encounter_listeners.remove(callback)
+
+    def submit(self, batch):
+        if len(batch):
+            self.pending.append(batch)
 
     def update(self, actor, damage, critical):
-        now = datetime.now()
-        with self.lock:
-            if self.global_start_time is None:
-                self.global_start_time = now
-
-            # If we haven't seen this actor yet, initialize their stats
-            if actor not in self.stats:
-                self.stats[actor] = {
-                    "total_damage": damage,
-                    "events": 1,
-                    "crit_events": 1 if critical else 0,
-                    "start_time": now,
-                    "class": None,
-                    "highest_hit": damage,  # Initialize highest_hit with this first damage
-                }
+        self.pending.append(("hit", self.symbols.intern(actor), damage, critical, time.time()))
+
+    def set_actor_class(self, actor, class_name):
+        self.pending.append(("class", self.symbols.intern(actor), class_name, time.time()))
+
+    def new_actor(self, actor, timestamp):
+        rolling = RollingDamage(timestamp, bucket_size=self.bucket_size, windows=self.rolling_windows)
+        return ActorStats(timestamp, rolling, self.actor_classes.get(actor))
+
+    def flush(self, now=None):
+        # Writer side: applies everything queued so far, slides the rolling DPS
+        # windows up to `now` and publishes a snapshot if anything changed.
+        # Returns the number of hits applied.
+        metrics = METRICS
+        started = time.perf_counter() if metrics.enabled else 0.0
+        applied = 0
+        pending = self.pending
+        while pending:
+            item = pending.popleft()
+            if item is _RESET:
+                # What was there so far still ends up in the history
+                self.close_encounter()
+                self.stats = {}
+                self.start_timestamp = None
+                self.newest_hit = None
+                self.dirty = set()
+                self.resets_applied += 1
+            elif isinstance(item, tuple):
+                self.apply_command(item)
             else:
-                self.stats[actor]["total_damage"] += damage
-                self.stats[actor]["events"] += 1
-                if critical:
-                    self.stats[actor]["crit_events"] += 1
+                self.apply_batch(item)
+                applied += len(item)
 
-                # Update highest hit if this damage is bigger
-                if damage > self.stats[actor]["highest_hit"]:
-                    self.stats[actor]["highest_hit"] = damage
+        now = time.time() if now is None else now
+        if self.encounter_open and now - self.newest_hit > self.idle_gap:
+            self.close_encounter()
+        bucket = int(now / self.bucket_size)
+        for actor, entry in self.stats.items():
+            if entry.rolling.advance_bucket(bucket):
+                self.dirty.add(actor)
+        if self.dirty or self.force_publish:
+            self.publish()
+        if metrics.enabled:
+            metrics.observe("aggregator.flush", time.perf_counter() - started)
+            metrics.count("aggregator.hits", applied)
+        return applied
 
-    def get_stats(self):
-        with self.lock:
-            return dict(self.stats)
+    def apply_batch(self, batch):
+        if batch.symbols is not self.symbols:
+            raise Exception("Parser and aggregator must share one SymbolTable.")
+        # May swap in fresh stats, so it goes before the locals below
+        self.open_encounter(batch.timestamps[0])
+        self.newest_hit = batch.timestamps[-1]
+        stats = self.stats
+        skill_classes = self.skill_classes
+        for actor, target, skill, damage, critical, timestamp in zip(batch.actors, batch.targets, batch.skills,
+                                                                     batch.damages, batch.crits, batch.timestamps):
+            entry = stats.get(actor)
+            if entry is None:
+                entry = stats[actor] = self.new_actor(actor, timestamp)
+            entry.total_damage += damage
+            entry.events += 1
+            if critical:
+                entry.crit_events += 1
+            if damage > entry.highest_hit:
+                entry.highest_hit = damage
 
-    def reset(self):
-        with self.lock:
-            self.stats = {}
-            self.seen_lines = set()
-            self.global_start_time = None
+            acc = entry.skills.get(skill)
+            if acc is None:
+                acc = entry.skills[skill] = [0, 0, 0, 0]
+            acc[DAMAGE] += damage
+            acc[HITS] += 1
+            if critical:
+                acc[CRITS] += 1
+            if damage > acc[HIGHEST]:
+                acc[HIGHEST] = damage
 
-    def set_actor_class(self, actor, class_name):
-        with self.lock:
-            if actor not in self.stats:
+            acc = entry.targets.get(target)
+            if acc is None:
+                acc = entry.targets[target] = [0, 0, 0, 0]
+            acc[DAMAGE] += damage
+            acc[HITS] += 1
+            if critical:
+                acc[CRITS] += 1
+            if damage > acc[HIGHEST]:
+                acc[HIGHEST] = damage
+
+            # Attempt to guess the class from the skill
+            if skill in skill_classes:
+                guessed_class = skill_classes[skill]
+            else:
+                guessed_class = skill_classes[skill] = SKILL_TO_CLASS.get(self.symbols.name(skill))
+            if guessed_class:
+                entry.class_name = guessed_class
+
+        touched = set(batch.actors)
+
+        # The rolling windows are fed once per actor and bucket, not per hit. A
+        # poll's hits share one timestamp, so usually each actor's damage in this
+        # batch goes in as one add().
+        timestamps = batch.timestamps
+        if int(timestamps[0] / self.bucket_size) == int(timestamps[-1] / self.bucket_size):
+            timestamp = timestamps[-1]
+            for actor in touched:
+                entry = stats[actor]
+                entry.rolling.add(timestamp, entry.total_damage - entry.rolled_damage)
+                entry.rolled_damage = entry.total_damage
+        else:
+            for actor, damage, timestamp in zip(batch.actors, batch.damages, timestamps):
+                stats[actor].rolling.add(timestamp, damage)
+            for actor in touched:
+                stats[actor].rolled_damage = stats[actor].total_damage
+        self.dirty |= touched
+
+    def apply_command(self, command):
+        kind, actor = command[0], command[1]
+        if kind == "hit":
+            self.open_encounter(command[4])
+        entry = self.stats.get(actor)
+        if kind == "hit":
+            _, _, damage, critical, timestamp = command
+            self.newest_hit = timestamp
+            if entry is None:
+                entry = self.stats[actor] = self.new_actor(actor, timestamp)
+            entry.total_damage += damage
+            entry.events += 1
+            if critical:
+                entry.crit_events += 1
+            if damage > entry.highest_hit:
+                entry.highest_hit = damage
+            entry.rolling.add(timestamp, damage)
+            entry.rolled_damage += damage
+        elif kind == "class":
+            _, _, class_name, timestamp = command
+            self.actor_classes[actor] = class_name
+            if not self.encounter_open:
+                return  # picked up by new_actor when the next encounter starts
+            if entry is None:
                 # If we haven't seen this actor yet, initialize
-                self.stats[actor] = {
-                    "total_damage": 0,
-                    "events": 0,
-                    "crit_events": 0,
-                    "start_time": datetime.now(),
-                    "class": class_name,
-                    "highest_hit": 0
-                }
+                self.stats[actor] = self.new_actor(actor, timestamp)
             else:
-                # If we have, just update their class
-                self.stats[actor]["class"] = class_name
+                entry.class_name = class_name
+        self.dirty.add(actor)
 
+    def open_encounter(self, timestamp):
+        # Called before applying hits stamped `timestamp`: closes the current
+        # encounter if the gap since its last hit is too long, and starts a new
+        # one if none is open
+        if self.encounter_open and timestamp - self.newest_hit > self.idle_gap:
+            self.close_encounter()
+        if self.encounter_open:
+            return
+        self.stats = {}
+        self.dirty = set()
+        self.start_timestamp = timestamp
+        self.newest_hit = timestamp
+        self.encounter_id += 1
+        self.encounter_open = True
+        self.fresh_snapshot = True
+
+    def close_encounter(self):
+        # Freezes the open encounter into the history. Writer side only.
+        if not self.encounter_open:
+            return None
+        self.encounter_open = False
+        if not self.stats:
+            return None
+        duration = max(1.0, self.newest_hit - self.start_timestamp)
+        names = self.symbols.names
+        stats = {}
+        for actor, entry in self.stats.items():
+            data = entry.as_dict()
+            data["dps"] = entry.total_damage / duration
+            data["skills"] = tuple(self.breakdown_rows(entry.skills, "skill"))
+            data["targets"] = tuple(self.breakdown_rows(entry.targets, "target"))
+            stats[names[actor]] = MappingProxyType(data)
+        summary = EncounterSummary(self.encounter_id, self.start_timestamp, self.newest_hit,
+                                   MappingProxyType(stats))
+        self.encounters = self.encounters + (summary,)
+        if self.history_size is not None:
+            self.encounters = self.encounters[-self.history_size:]
+        self.force_publish = True
+        log.info("Encounter %d closed: %d actors, %.0fs", summary.id, len(stats), summary.duration)
+        for callback in list(self.encounter_listeners):
+            try:
+                callback(summary)
+            except Exception as e:
+                log.exception("Encounter listener failed: %s", e)
+        return summary
+
+    def get_encounters(self):
+        # Finished encounters, oldest first
+        return self.encounters
+
+    def publish(self):
+        # Rebuild only the dicts of actors that changed; the rest are shared with
+        # the previous snapshot, which is fine because nobody mutates them.
+        names = self.symbols.names
+        keep = self.resets_applied == self.resets_requested and not self.fresh_snapshot
+        stats = dict(self.snapshot.stats) if keep else {}
+        for actor in self.dirty:
+            stats[names[actor]] = self.stats[actor].as_dict()
+        self.dirty = set()
+        self.fresh_snapshot = False
+        self.force_publish = False
+        start_time = datetime.fromtimestamp(self.start_timestamp) if self.start_timestamp is not None else None
+        waited = time.perf_counter() if METRICS.enabled else 0.0
+        with self.publish_lock:
+            if METRICS.enabled:
+                METRICS.observe("aggregator.publish_lock_wait", time.perf_counter() - waited)
+            # A reset that we haven't drained yet wins over stale pre-reset numbers
+            if self.resets_applied != self.resets_requested:
+                return
+            snapshot = self.snapshot = StatsSnapshot(self.snapshot.version + 1, MappingProxyType(stats), start_time,
+                                                     self.newest_hit, self.encounter_id)
+        self.notify(snapshot)
+
+    def get_skill_breakdown(self, actor):
+        return self.get_breakdown(actor, "skills", "skill")
+
+    def get_target_breakdown(self, actor):
+        return self.get_breakdown(actor, "targets", "target")
+
+    def get_breakdown(self, actor, table, label):
+        # Safe from any thread: copying the dict and each counter list are single
+        # C-level operations, so every row is internally consistent.
+        actor_id = self.symbols.lookup(actor)
+        entry = self.stats.get(actor_id) if actor_id is not None else None
+        if entry is None:
+            return []
+        return self.breakdown_rows(getattr(entry, table), label)
 
+    def breakdown_rows(self, counters, label):
+        names = self.symbols.names
+        rows = []
+        for key, acc in list(counters.items()):
+            damage, hits, crits, highest = acc[:]
+            rows.append({
+                label: names[key],
+                "total_damage": damage,
+                "hits": hits,
+                "crit_hits": crits,
+                "highest_hit": highest,
+            })
+        rows.sort(key=lambda row: row["total_damage"], reverse=True)
+        return rows
+
+    def get_dps_series(self, actor):
+        actor_id = self.symbols.lookup(actor)
+        entry = self.stats.get(actor_id) if actor_id is not None else None
+        return entry.rolling.dps_series() if entry is not None else []
+
+    def get_snapshot(self):
+        return self.snapshot
+
+    def get_stats(self):
+        return self.snapshot.stats
+
+    def reset(self):
+        # Callable from any thread: readers see an empty meter straight away and
+        # the writer discards its state when it reaches the marker.
+        with self.publish_lock:
+            self.resets_requested += 1
+            self.pending.append(_RESET)
+            snapshot = self.snapshot = StatsSnapshot(self.snapshot.version + 1, EMPTY_STATS, None,
+                                                     encounter=self.encounter_id)
+        self.notify(snapshot)
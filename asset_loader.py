@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import tkinter as tk
+
+from paths import data_dir
+
+log = logging.getLogger(__name__)
+
+
+def bundled_asset(name):
+    # assets/ next to the sources, or inside the PyInstaller bundle (main.spec ships it)
+    root = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, "assets", name)
+
+
+class AssetCache:
+    # Downloaded extras live in <cache>/<sha256(url)>-<sha256(content)><ext>.
+    # The content half is checked on every read, so a truncated or tampered
+    # file is refetched instead of handed to the decoder.
+    def __init__(self, directory):
+        self.directory = directory
+
+    def url_key(self, url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, url):
+        prefix = self.url_key(url) + "-"
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix):
+                continue
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as handle:
+                data = handle.read()
+            if name[len(prefix):].startswith(hashlib.sha256(data).hexdigest()[:16]):
+                return data
+            os.remove(path)
+        return None
+
+    def put(self, url, data):
+        ext = os.path.splitext(url.split("?")[0])[1] or ".bin"
+        name = f"{self.url_key(url)}-{hashlib.sha256(data).hexdigest()[:16]}{ext}"
+        tmp_path = os.path.join(self.directory, name + ".tmp")
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def fetch(self, url, timeout=5):
+        data = self.get(url)
+        if data is None:
+            import requests
+            response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+            response.raise_for_status()
+            data = response.content
+            self.put(url, data)
+        return data
+
+
+class AssetLoader:
+    # Resolves, decodes and resizes images on a background thread so the window
+    # can be drawn straight away with placeholders. Only the PhotoImage itself
+    # is created on the Tk thread, which drain() does from the Tk event loop.
+    def __init__(self, root, cache_dir=None, poll_interval=30):
+        self.root = root
+        self.cache = AssetCache(cache_dir if cache_dir is not None else data_dir("cache", "assets"))
+        self.poll_interval = poll_interval
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.images = []  # keep every PhotoImage referenced, Tk doesn't
+        self.outstanding = 0
+        self.started = time.perf_counter()
+        self.timings = {}  # asset name -> seconds from loader start until it was ready
+        self.ready_time = None  # time.perf_counter() when the last requested asset was done
+        self.thread = threading.Thread(target=self.run, name="asset-loader", daemon=True)
+        self.thread.start()
+        self.draining = False
+
+    def placeholder(self, size):
+        image = tk.PhotoImage(width=size[0], height=size[1])
+        self.images.append(image)
+        return image
+
+    def load(self, name, size, callback, url=None):
+        # callback(PhotoImage) runs on the Tk thread once the asset is ready; it
+        # is never called if neither the bundled file nor `url` can be loaded
+        self.outstanding += 1
+        self.requests.put((name, size, callback, url))
+        if not self.draining:
+            self.draining = True
+            self.root.after(self.poll_interval, self.drain)
+
+    def run(self):
+        while True:
+            name, size, callback, url = self.requests.get()
+            try:
+                decoded = self.decode(self.read(name, url), size)
+            except Exception as e:
+                log.warning("Failed to load asset %s: %s", name, e)
+                decoded = None
+            self.results.put((name, size, callback, decoded))
+
+    def read(self, name, url):
+        path = bundled_asset(name)
+        if os.path.exists(path):
+            with open(path, "rb") as handle:
+                return handle.read()
+        if url is None:
+            raise Exception(f"{path} is missing and there is no remote copy")
+        return self.cache.fetch(url)
+
+    def decode(self, data, size):
+        # Returns a resized PIL image, or the raw bytes when Pillow isn't
+        # available and Tk has to decode the PNG itself
+        try:
+            from io import BytesIO
+            from PIL import Image
+        except ImportError:
+            return data
+        image = Image.open(BytesIO(data))
+        image.load()
+        if size and image.size != size:
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        return image
+
+    def drain(self):
+        received = False
+        while True:
+            try:
+                name, size, callback, decoded = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.outstanding -= 1
+            received = True
+            if decoded is None:
+                continue
+            try:
+                image = self.to_photo_image(decoded, size)
+                self.images.append(image)
+                self.timings[name] = time.perf_counter() - self.started
+                callback(image)
+            except Exception as e:
+                log.warning("Failed to display asset %s: %s", name, e)
+        if self.outstanding:
+            self.root.after(self.poll_interval, self.drain)
+            return
+        self.draining = False
+        self.ready_time = time.perf_counter()
+        if received:
+            log.info("%d assets ready %.0f ms after startup", len(self.timings),
+                     (time.perf_counter() - self.started) * 1000)
+
+    def to_photo_image(self, decoded, size):
+        if isinstance(decoded, bytes):
+            # Tk's own PNG decoder can only shrink by whole factors
+            image = tk.PhotoImage(data=decoded)
+            factor = max(1, image.width() // size[0]) if size else 1
+            return image.subsample(factor) if factor > 1 else image
+        from PIL import ImageTk
+        return ImageTk.PhotoImage(decoded)
@@ -0,0 +1,177 @@
+import random
+from array import array
+import threading
+import time
+from datetime import datetime
+
+from aggregator import Aggregator
+from combat_log_parser import ParsedBatch
+from events import SymbolTable
+from rolling import RollingDamage
+from skill_map import SKILL_TO_CLASS
+
+ACTORS = [f"Player{i}" for i in range(24)]
+SKILLS = list(SKILL_TO_CLASS)[:30]
+POLL_SIZE = 50
+
+
+class LockedAggregator:
+    # The aggregator as it was before batched ingestion, kept as the baseline
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.global_start_time = None
+
+    def update(self, actor, damage, critical):
+        now = datetime.now()
+        with self.lock:
+            if self.global_start_time is None:
+                self.global_start_time = now
+            if actor not in self.stats:
+                self.stats[actor] = {
+                    "total_damage": damage,
+                    "events": 1,
+                    "crit_events": 1 if critical else 0,
+                    "start_time": now,
+                    "class": None,
+                    "highest_hit": damage,
+                }
+            else:
+                self.stats[actor]["total_damage"] += damage
+                self.stats[actor]["events"] += 1
+                if critical:
+                    self.stats[actor]["crit_events"] += 1
+                if damage > self.stats[actor]["highest_hit"]:
+                    self.stats[actor]["highest_hit"] = damage
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def set_actor_class(self, actor, class_name):
+        with self.lock:
+            self.stats[actor]["class"] = class_name
+
+
+class LockedFullAggregator(LockedAggregator):
+    # The locked design doing what Aggregator does per hit: skill and target
+    # breakdowns and rolling DPS windows, with readers getting finished per-actor
+    # dicts. The plain LockedAggregator only keeps totals, so comparing it with
+    # the batched path mostly measures the features added since.
+    def __init__(self):
+        super().__init__()
+        self.breakdowns = {}
+
+    def update(self, actor, damage, critical, skill=None, target=None):
+        timestamp = time.time()
+        super().update(actor, damage, critical)
+        with self.lock:
+            breakdown = self.breakdowns.get(actor)
+            if breakdown is None:
+                breakdown = self.breakdowns[actor] = ({}, {}, RollingDamage(timestamp))
+            for counters, key in ((breakdown[0], skill), (breakdown[1], target)):
+                acc = counters.get(key)
+                if acc is None:
+                    acc = counters[key] = [0, 0, 0, 0]
+                acc[0] += damage
+                acc[1] += 1
+                if critical:
+                    acc[2] += 1
+                if damage > acc[3]:
+                    acc[3] = damage
+            breakdown[2].add(timestamp, damage)
+
+    def get_stats(self):
+        with self.lock:
+            stats = {}
+            for actor, data in self.stats.items():
+                stats[actor] = dict(data)
+                self.breakdowns[actor][2].fill_stats(stats[actor])
+            return stats
+
+
+def make_hits(count, seed=3):
+    rng = random.Random(seed)
+    return [(rng.choice(ACTORS), rng.randint(100, 90000), rng.choice(SKILLS), rng.random() < 0.3)
+            for _ in range(count)]
+
+
+def locked_producer(aggregator, hits, stop):
+    produced = 0
+    while not stop.is_set():
+        for actor, damage, skill, critical in hits:
+            aggregator.update(actor, damage, critical)
+            aggregator.set_actor_class(actor, SKILL_TO_CLASS[skill])
+        produced += len(hits)
+    return produced
+
+
+def locked_full_producer(aggregator, hits, stop):
+    produced = 0
+    while not stop.is_set():
+        for actor, damage, skill, critical in hits:
+            aggregator.update(actor, damage, critical, skill, "Boss")
+            aggregator.set_actor_class(actor, SKILL_TO_CLASS[skill])
+        produced += len(hits)
+    return produced
+
+
+def batched_producer(aggregator, hits, stop):
+    symbols = aggregator.symbols
+    batches = []
+    for i in range(0, len(hits), POLL_SIZE):
+        batch = ParsedBatch(symbols)
+        for actor, damage, skill, critical in hits[i:i + POLL_SIZE]:
+            batch.append(symbols.intern(actor), symbols.intern("Boss"), symbols.intern(skill),
+                         damage, critical, time.time())
+        batches.append(batch)
+    produced = 0
+    while not stop.is_set():
+        for batch in batches:
+            batch.timestamps = array("d", [time.time()]) * len(batch)
+            aggregator.submit(batch)
+            aggregator.flush()
+        produced += len(hits)
+    return produced
+
+
+def reader(aggregator, stop, latencies):
+    # What DPSWindow.update_ui does with the stats, minus Tk
+    while not stop.is_set():
+        started = time.perf_counter()
+        stats = aggregator.get_stats()
+        sorted(stats.items(), key=lambda x: x[1]["total_damage"], reverse=True)
+        latencies.append(time.perf_counter() - started)
+
+
+def run(name, aggregator, producer, hits, duration):
+    stop = threading.Event()
+    latencies = []
+    result = {}
+    producer_thread = threading.Thread(target=lambda: result.setdefault("produced", producer(aggregator, hits, stop)))
+    reader_thread = threading.Thread(target=reader, args=(aggregator, stop, latencies))
+    producer_thread.start()
+    reader_thread.start()
+    time.sleep(duration)
+    stop.set()
+    producer_thread.join()
+    reader_thread.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    print(f"{name:>8}: {result['produced'] / duration:12,.0f} events/sec ingested, "
+          f"{len(latencies) / duration:10,.0f} reads/sec, p99 read {p99 * 1e6:8.1f} us, "
+          f"max read {latencies[-1] * 1e6 if latencies else 0:8.1f} us")
+
+
+def main(duration=2.0):
+    hits = make_hits(5000)
+    # "locked" is the pre-batching aggregator (totals only), "locked+" the same
+    # design doing the batched path's per-hit work
+    run("locked", LockedAggregator(), locked_producer, hits, duration)
+    run("locked+", LockedFullAggregator(), locked_full_producer, hits, duration)
+    run("batched", Aggregator(SymbolTable()), batched_producer, hits, duration)
+
+
+if __name__ == "__main__":
+    main()
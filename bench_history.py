@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from types import MappingProxyType
+
+from aggregator import EncounterSummary
+from history_store import HistoryStore, week_start
+
+CLASSES = ["Warrior", "Ranger", "Mage", "Rogue", "Cleric", "Paladin"]
+DAY = 86400
+
+
+def synthetic_encounters(count, actors, days):
+    # Pulls spread over the last `days` days, `actors` players out of a guild of 40
+    random.seed(1)
+    guild = {f"Player{i}": CLASSES[i % len(CLASSES)] for i in range(40)}
+    now = time.time()
+    encounters = []
+    for encounter_id in range(1, count + 1):
+        start = now - random.random() * days * DAY
+        duration = random.uniform(20, 600)
+        stats = {}
+        for actor in random.sample(list(guild), actors):
+            damage = int(random.uniform(500, 5000) * duration)
+            stats[actor] = MappingProxyType({
+                "total_damage": damage, "events": int(duration * 2), "crit_events": int(duration / 3),
+                "class": guild[actor], "highest_hit": random.randint(2000, 30000),
+                "peak_dps": damage / duration * 1.5, "dps": damage / duration,
+            })
+        encounters.append(EncounterSummary(encounter_id, start, start + duration, MappingProxyType(stats)))
+    return encounters
+
+
+def timed(label, call, repeat=200):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"  {label:<34}{elapsed * 1000:8.3f} ms  ({len(result)} rows)")
+
+
+def main():
+    args_parser = argparse.ArgumentParser(description="History store insert and query timings")
+    args_parser.add_argument("--encounters", type=int, default=5000)
+    args_parser.add_argument("--actors", type=int, default=10)
+    args_parser.add_argument("--days", type=int, default=90)
+    args = args_parser.parse_args()
+
+    encounters = synthetic_encounters(args.encounters, args.actors, args.days)
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, "history.sqlite3"))
+        started = time.perf_counter()
+        store.import_summaries(encounters)
+        elapsed = time.perf_counter() - started
+        print(f"Inserted {args.encounters} encounters x {args.actors} actors in {elapsed:.2f}s")
+
+        week = week_start()
+        print("Queries:")
+        timed("best pull for actor, this week", lambda: store.best_pulls("Player7", since=week, limit=1))
+        timed("best pulls for actor, all time", lambda: store.best_pulls("Player7", limit=10))
+        timed("best Mage pulls, last 30 days", lambda: store.best_by_class("Mage", since=time.time() - 30 * DAY))
+        timed("actor history, last 50", lambda: store.actor_history("Player7", limit=50))
+        timed("encounters this week", lambda: store.encounters(since=week))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
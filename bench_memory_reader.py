@@ -0,0 +1,42 @@
+import time
+
+from fake_process import build_combat_log_image
+from memory_reader import MemoryReader
+
+SAMPLE_LINES = [
+    "Ashen Knight received 12,345 damage from Mira&apos;s Lightning Slash.",
+    "Dragontongue critically hit Ashen Knight for 48,210 damage.",
+    "Received 3,120 damage from Ashen Knight&apos;s Cleave.",
+    "Ashen Knight&apos;s Shockwave inflicted 2,480 damage and Daze.",
+    "Blocked Ashen Knight&apos;s Cleave but received 410 damage.",
+]
+
+
+def run(reader, image, polls):
+    reader.get_combat_chat_log()  # warm the pointer chain cache
+    image.reset_counters()
+    started = time.perf_counter()
+    for _ in range(polls):
+        lines = reader.get_combat_chat_log()
+    elapsed = time.perf_counter() - started
+    return lines, elapsed, image.read_calls / polls, image.bytes_read / polls
+
+
+def main(polls=200):
+    ring = [SAMPLE_LINES[i % len(SAMPLE_LINES)] for i in range(MemoryReader.COMBAT_LOG_LENGTH)]
+    image = build_combat_log_image(ring)
+
+    results = {}
+    for name, bulk in (("per-slot", False), ("bulk", True)):
+        reader = MemoryReader(source=image, bulk_snapshot=bulk)
+        lines, elapsed, reads, nbytes = run(reader, image, polls)
+        results[name] = lines
+        print(f"{name:>9}: {polls / elapsed:8.1f} polls/sec, {reads:7.1f} reads/poll, "
+              f"{nbytes / 1024:7.1f} KiB/poll")
+
+    if results["per-slot"] != results["bulk"]:
+        raise SystemExit("bulk snapshot returned different lines than the per-slot reader")
+
+
+if __name__ == "__main__":
+    main()
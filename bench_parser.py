@@ -0,0 +1,164 @@
+import random
+import re
+import time
+
+from combat_log_parser import CombatLogParser
+
+ACTORS = ["Mira", "Kaelen", "Shiro", "Yuna", "Doran", "Velka"]
+TARGETS = ["Ashen Knight", "Training Dummy", "Naryu Guardian", "Hexed Wolf"]
+SKILLS = ["Lightning Slash", "Dragontongue", "Flash Step", "Blade Call", "Galeforce", "Flicker"]
+
+# Lines from the combat log that none of the patterns pick up
+NON_MATCHING = [
+    "You gained 1,254 Exp",
+    "Mira has joined the party",
+    "Kaelen: pull in 5, stack on the left",
+    "Recovered 2,310 HP",
+    "You have obtained Moonstone x3",
+    "Ashen Knight is now Enraged",
+    "Hexed Wolf resisted Flicker",
+    "Shiro&apos;s Guard was removed",
+    "You received the Wind Blessing effect",
+    "Naryu Guardian was defeated",
+]
+
+
+class ShippedPatterns:
+    # The patterns exactly as the pre-dispatch parser shipped them. The skill
+    # group at the end of the first and third is unanchored, so re.match cuts
+    # those skills to one character; CombatLogParser fixed that later.
+    OtherPlayerExpression = re.compile(
+        r"(?P<target>.+?) received (?P<damage>\d+(?:,\d+)?) (?P<critical>Critical Damage|damage)(?: and Daze)? from (?P<actor>.+?)&apos;s (?P<skill>.+?)(?:\.)?"
+    )
+    YouExpression = re.compile(
+        r"(?P<skill>.+?) (?P<critical>critically hit|hit) (?P<target>.+?) for (?P<damage>\d+(?:,\d+)?) damage(?:\.)?"
+    )
+    ReceivedExpression1 = re.compile(
+        r"Received (?P<damage>\d+(?:,\d+)?) damage from (?P<actor>.+?)&apos;s (?P<skill>.+?)(?:\.)?"
+    )
+    ReceivedExpression2 = re.compile(
+        r"(?P<actor>.+?)&apos;s (?P<skill>.+?) inflicted (?P<damage>\d+(?:,\d+)?) damage(?: and (?P<debuff>.+?))?(?:\.)?"
+    )
+    BlockedExpression = re.compile(
+        r"Blocked (?P<actor>.+?)&apos;s (?P<skill>.+?) but received (?P<damage>\d+(?:,\d+)?) damage(?:\.)?"
+    )
+
+
+def legacy_evaluate(line, patterns=CombatLogParser):
+    # Pre-dispatch implementation: every regex in turn, no literal prefilter.
+    # With the default patterns it is the reference for the equivalence check;
+    # with ShippedPatterns it is the speed baseline, i.e. what actually shipped.
+    match = patterns.OtherPlayerExpression.match(line)
+    if match:
+        target = match.group("target")
+        actor = match.group("actor")
+        damage = int(match.group("damage").replace(",", ""))
+        skill = match.group("skill")
+        critical = "critical" in match.group("critical").lower()
+        return (actor, damage, target, skill, critical)
+
+    match = patterns.YouExpression.match(line)
+    if match:
+        target = match.group("target")
+        damage = int(match.group("damage").replace(",", ""))
+        skill = match.group("skill")
+        critical = "critical" in match.group("critical").lower()
+        return ("You", damage, target, skill, critical)
+
+    match = patterns.ReceivedExpression1.match(line)
+    if match:
+        actor = match.group("actor")
+        damage = int(match.group("damage").replace(",", ""))
+        skill = match.group("skill")
+        return (actor, damage, "You", skill, False)
+
+    match = patterns.ReceivedExpression2.match(line)
+    if match:
+        actor = match.group("actor")
+        damage = int(match.group("damage").replace(",", ""))
+        skill = match.group("skill")
+        return (actor, damage, "You", skill, False)
+
+    match = patterns.BlockedExpression.match(line)
+    if match:
+        actor = match.group("actor")
+        damage = int(match.group("damage").replace(",", ""))
+        skill = match.group("skill")
+        return (actor, damage, "You", skill, False)
+
+    return None
+
+
+def make_corpus(size=20000, non_matching_ratio=0.3, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < non_matching_ratio:
+            corpus.append(rng.choice(NON_MATCHING))
+            continue
+        actor, target, skill = rng.choice(ACTORS), rng.choice(TARGETS), rng.choice(SKILLS)
+        damage = f"{rng.randint(100, 99999):,}"
+        kind = rng.randrange(6)
+        if kind == 0:
+            corpus.append(f"{target} received {damage} damage from {actor}&apos;s {skill}")
+        elif kind == 1:
+            corpus.append(f"{target} received {damage} Critical Damage and Daze from {actor}&apos;s {skill}")
+        elif kind == 2:
+            verb = rng.choice(["hit", "critically hit"])
+            corpus.append(f"{skill} {verb} {target} for {damage} damage")
+        elif kind == 3:
+            corpus.append(f"Received {damage} damage from {target}&apos;s {skill}")
+        elif kind == 4:
+            corpus.append(f"{target}&apos;s {skill} inflicted {damage} damage and Stun")
+        else:
+            corpus.append(f"Blocked {target}&apos;s {skill} but received {damage} damage")
+    return corpus
+
+
+def measure(evaluate, corpus, rounds=5):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for line in corpus:
+            evaluate(line)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(corpus) / best
+
+
+def main():
+    corpus = make_corpus()
+    for line in corpus:
+        if legacy_evaluate(line) != CombatLogParser.evaluate_combat_log_line(line):
+            raise SystemExit(f"parser output differs for line: {line!r}")
+        result = legacy_evaluate(line)
+        if result is not None and result[3] not in SKILLS:
+            raise SystemExit(f"reference cut the skill name short: {result[3]!r} in {line!r}")
+
+    non_matching = [line for line in corpus if legacy_evaluate(line) is None]
+    for name, lines in (("mixed corpus", corpus), ("non-matching only", non_matching)):
+        before = measure(lambda line: legacy_evaluate(line, ShippedPatterns), lines)
+        after = measure(CombatLogParser.evaluate_combat_log_line, lines)
+        print(f"{name:>18}: {before:12,.0f} lines/sec before, {after:12,.0f} lines/sec after "
+              f"({after / before:.2f}x)")
+
+    # parse_batch in poll-sized chunks, with a fresh parser per round so the
+    # template cache warms up inside the measurement
+    expected = [result for result in map(legacy_evaluate, corpus) if result]
+    if list(CombatLogParser().parse_batch(corpus).named()) != expected:
+        raise SystemExit("parse_batch output differs from per-line parsing")
+    polls = [corpus[i:i + 50] for i in range(0, len(corpus), 50)]
+    best = None
+    for _ in range(5):
+        parser = CombatLogParser()
+        started = time.perf_counter()
+        for poll in polls:
+            parser.parse_batch(poll)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    hit_rate = parser.cache_hits / max(1, parser.cache_hits + parser.cache_misses)
+    print(f"{'parse_batch':>18}: {len(corpus) / best:12,.0f} lines/sec, template cache hit rate {hit_rate:.0%}")
+
+
+if __name__ == "__main__":
+    main()
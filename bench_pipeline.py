@@ -0,0 +1,121 @@
+import argparse
+import functools
+import threading
+import time
+
+from aggregator import Aggregator
+from combat_log_parser import CombatLogParser
+from events import SymbolTable
+from fake_process import SimulatedGameProcess
+from loadtest import NORMAL_RATE, percentile
+from memory_reader import MemoryReader
+from poll_scheduler import AdaptivePollScheduler
+from process_pipeline import ReaderProcess
+from worker import combat_log_worker
+
+
+def start_simulated_game(lines_per_second):
+    # Source factory for both modes; the game starts writing once the reader
+    # has taken its baseline of the empty ring
+    game = SimulatedGameProcess(lines_per_second=lines_per_second)
+    threading.Timer(0.2, game.start).start()
+    return game
+
+
+def render_frame(snapshot):
+    # Roughly what DPSWindow.redraw does with a snapshot, minus Tk
+    stats = snapshot.stats
+    rows = sorted(stats.items(), key=lambda item: item[1]["total_damage"], reverse=True)
+    total = sum(data["total_damage"] for _, data in rows) or 1
+    return [f"{actor} {data['total_damage']:,} ({data['total_damage'] / total:.1%}) "
+            f"{data['crit_events'] / max(1, data['events']):.0%} {data.get('dps_5s', 0):,.0f}"
+            for actor, data in rows]
+
+
+def run_ui(aggregator, duration, frame_rate):
+    # Stands in for the Tk loop: a frame every 1/frame_rate s on this thread.
+    # Lateness is how far a frame started after its deadline (a stalled
+    # after() callback); latency is parse time -> visible in a snapshot.
+    interval = 1.0 / frame_rate
+    frame_times, lateness, latencies = [], [], []
+    newest_seen = None
+    started = time.perf_counter()
+    deadline = started + interval
+    while deadline < started + duration:
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+        frame_started = time.perf_counter()
+        lateness.append(frame_started - deadline)
+        snapshot = aggregator.snapshot
+        if snapshot.newest_hit is not None and snapshot.newest_hit != newest_seen:
+            newest_seen = snapshot.newest_hit
+            latencies.append(time.time() - newest_seen)
+        render_frame(snapshot)
+        frame_times.append(time.perf_counter() - frame_started)
+        deadline += interval
+    for values in (frame_times, lateness, latencies):
+        values.sort()
+    return frame_times, lateness, latencies
+
+
+def run_mode(mode, lines_per_second, duration, frame_rate):
+    symbols = SymbolTable()
+    aggregator = Aggregator(symbols)
+    factory = functools.partial(start_simulated_game, lines_per_second)
+    if mode == "thread":
+        game = factory()
+        scheduler = AdaptivePollScheduler(min_interval=0.05, max_interval=1.0)
+        stop_event = threading.Event()
+        worker_thread = threading.Thread(
+            target=combat_log_worker,
+            args=(MemoryReader(source=game), CombatLogParser(symbols), aggregator, stop_event, scheduler),
+            daemon=True
+        )
+        worker_thread.start()
+        time.sleep(0.3)
+        ui = run_ui(aggregator, duration, frame_rate)
+        game.stop()
+        time.sleep(1.1)  # let the worker drain the ring
+        stop_event.set()
+        worker_thread.join()
+        written = game.lines_written
+    else:
+        reader_process = ReaderProcess(aggregator, source_factory=factory, log_level="WARNING")
+        reader_process.start()
+        if not reader_process.attached.wait(30):
+            raise Exception("Reader process did not attach to the simulated game")
+        time.sleep(0.3)
+        ui = run_ui(aggregator, duration, frame_rate)
+        reader_process.stop(timeout=5)
+        written = reader_process.child_stats["lines_written"]
+
+    aggregated = sum(data["events"] for data in aggregator.get_stats().values())
+    return written, aggregated, ui
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the threaded reader with the reader process: "
+                                                 "throughput and UI frame timing under load.")
+    parser.add_argument("--multipliers", default="1,10,100",
+                        help=f"comma separated multiples of the normal rate ({NORMAL_RATE} lines/sec)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--frame-rate", type=float, default=10.0, help="simulated UI frames per second")
+    parser.add_argument("--modes", default="thread,process")
+    args = parser.parse_args(argv)
+
+    for multiplier in (float(m) for m in args.multipliers.split(",")):
+        rate = NORMAL_RATE * multiplier
+        print(f"{multiplier:g}x ({rate:,.0f} lines/sec):")
+        for mode in args.modes.split(","):
+            written, aggregated, (frame_times, lateness, latencies) = run_mode(mode, rate, args.duration,
+                                                                               args.frame_rate)
+            print(f"  {mode:<8}{aggregated:,} of {written:,} lines aggregated, "
+                  f"{aggregated / args.duration:,.0f} lines/sec")
+            print(f"          frame p50 {percentile(frame_times, 0.5) * 1000:.2f} ms, "
+                  f"p99 {percentile(frame_times, 0.99) * 1000:.2f} ms; "
+                  f"late p50 {percentile(lateness, 0.5) * 1000:.2f} ms, "
+                  f"p99 {percentile(lateness, 0.99) * 1000:.2f} ms; "
+                  f"parse->visible p50 {percentile(latencies, 0.5) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
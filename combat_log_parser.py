@@ -1,14 +1,64 @@
 import re
+import time
+from array import array
+from collections import OrderedDict, defaultdict
+
+from events import CombatEvent, SymbolTable
+from instrumentation import METRICS
+
+
+class ParsedBatch:
+    # Column-oriented parse results for one poll's worth of lines. Actor, target
+    # and skill are ids in `symbols`; iterating yields CombatEvent records.
+    __slots__ = ("symbols", "actors", "targets", "skills", "damages", "crits", "timestamps")
+
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.actors = array("I")
+        self.targets = array("I")
+        self.skills = array("I")
+        self.damages = array("q")
+        self.crits = bytearray()
+        self.timestamps = array("d")
+
+    def append(self, actor, target, skill, damage, critical, timestamp):
+        self.actors.append(actor)
+        self.targets.append(target)
+        self.skills.append(skill)
+        self.damages.append(damage)
+        self.crits.append(critical)
+        self.timestamps.append(timestamp)
+
+    def append_event(self, event):
+        self.append(event.actor, event.target, event.skill, event.damage, event.critical, event.timestamp)
+
+    def __len__(self):
+        return len(self.damages)
+
+    def __iter__(self):
+        for i in range(len(self.damages)):
+            yield CombatEvent(self.actors[i], self.targets[i], self.skills[i],
+                              self.damages[i], bool(self.crits[i]), self.timestamps[i])
+
+    def named(self):
+        # Same tuple layout as evaluate_combat_log_line
+        name = self.symbols.name
+        for i in range(len(self.damages)):
+            yield (name(self.actors[i]), self.damages[i], name(self.targets[i]),
+                   name(self.skills[i]), bool(self.crits[i]))
+
 
 class CombatLogParser:
+    # The skill name ends these two lines, so they are anchored at the end: left
+    # open, re.match stops the lazy skill group after its first character.
     OtherPlayerExpression = re.compile(
-        r"(?P<target>.+?) received (?P<damage>\d+(?:,\d+)?) (?P<critical>Critical Damage|damage)(?: and Daze)? from (?P<actor>.+?)&apos;s (?P<skill>.+?)(?:\.)?"
+        r"(?P<target>.+?) received (?P<damage>\d+(?:,\d+)?) (?P<critical>Critical Damage|damage)(?: and Daze)? from (?P<actor>.+?)&apos;s (?P<skill>.+?)\.?$"
     )
     YouExpression = re.compile(
         r"(?P<skill>.+?) (?P<critical>critically hit|hit) (?P<target>.+?) for (?P<damage>\d+(?:,\d+)?) damage(?:\.)?"
     )
     ReceivedExpression1 = re.compile(
-        r"Received (?P<damage>\d+(?:,\d+)?) damage from (?P<actor>.+?)&apos;s (?P<skill>.+?)(?:\.)?"
+        r"Received (?P<damage>\d+(?:,\d+)?) damage from (?P<actor>.+?)&apos;s (?P<skill>.+?)\.?$"
     )
     ReceivedExpression2 = re.compile(
         r"(?P<actor>.+?)&apos;s (?P<skill>.+?) inflicted (?P<damage>\d+(?:,\d+)?) damage(?: and (?P<debuff>.+?))?(?:\.)?"
@@ -17,44 +67,174 @@ class CombatLogParser:
         r"Blocked (?P<actor>.+?)&apos;s (?P<skill>.+?) but received (?P<damage>\d+(?:,\d+)?) damage(?:\.)?"
     )
 
+    def __init__(self, symbols=None, cache_size=4096):
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.cache_size = cache_size
+        self.template_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def parse_batch(self, lines, timestamp=None):
+        # Parses a whole poll at once, stamping every hit with the poll time. Lines
+        # that only differ in their damage figure share a template, so repeats of a
+        # known template skip the regexes and the name interning.
+        metrics = METRICS
+        started = time.perf_counter() if metrics.enabled else 0.0
+        # Per-pattern match counts, only collected while metrics are on
+        counts = defaultdict(int) if metrics.enabled else None
+        if timestamp is None:
+            timestamp = time.time()
+        batch = ParsedBatch(self.symbols)
+        add_actor = batch.actors.append
+        add_target = batch.targets.append
+        add_skill = batch.skills.append
+        add_damage = batch.damages.append
+        add_crit = batch.crits.append
+        add_time = batch.timestamps.append
+        intern = self.symbols.intern
+        cache = self.template_cache
+        find_damage_token = self.find_damage_token
+        evaluate = self.evaluate_combat_log_line
+        hits = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            span = find_damage_token(line)
+            if span is not None:
+                start, end = span
+                template = line[:start] + "\x00" + line[end:]
+                cached = cache.get(template)
+                if cached is not None:
+                    hits += 1
+                    cache.move_to_end(template)
+                    actor, target, skill, critical = cached
+                    add_actor(actor)
+                    add_target(target)
+                    add_skill(skill)
+                    add_damage(int(line[start:end].replace(",", "")))
+                    add_crit(critical)
+                    add_time(timestamp)
+                    continue
+
+            result = evaluate(line, counts)
+            if result is None:
+                continue
+            actor_name, damage, target_name, skill_name, critical = result
+            actor, target, skill = intern(actor_name), intern(target_name), intern(skill_name)
+            add_actor(actor)
+            add_target(target)
+            add_skill(skill)
+            add_damage(damage)
+            add_crit(critical)
+            add_time(timestamp)
+            if span is not None:
+                self.cache_misses += 1
+                self.remember_template(line, template, start, end, result, (actor, target, skill, critical))
+        self.cache_hits += hits
+        if counts is not None:
+            for name, value in counts.items():
+                metrics.count(name, value)
+            metrics.count("parser.lines", len(lines))
+            metrics.count("parser.hits", len(batch))
+            metrics.count("parser.template_hits", hits)
+            metrics.observe("parser.batch", time.perf_counter() - started)
+        return batch
+
+    @staticmethod
+    def find_damage_token(line):
+        # Span of the "1,234" in "... 1,234 damage" / "... 1,234 Critical Damage",
+        # or None when there is no well-formed figure in front of the first marker.
+        end = line.find(" damage")
+        crit_end = line.find(" Critical Damage")
+        if end == -1 or (crit_end != -1 and crit_end < end):
+            end = crit_end
+        if end <= 0:
+            return None
+        start = len(line[:end].rstrip("0123456789,"))
+        token = line[start:end]
+        if not token or token[0] == "," or token[-1] == "," or not token.replace(",", "", 1).isdecimal():
+            return None
+        return start, end
+
+    def remember_template(self, line, template, start, end, result, entry):
+        # Only cache a template when swapping in another damage figure changes
+        # nothing but the damage, i.e. the token really is the parsed damage.
+        probe_damage = 1 if result[1] != 1 else 2
+        probe = self.evaluate_combat_log_line(f"{line[:start]}{probe_damage}{line[end:]}")
+        actor, damage, target, skill, critical = result
+        if probe != (actor, probe_damage, target, skill, critical):
+            return
+        self.template_cache[template] = entry
+        if len(self.template_cache) > self.cache_size:
+            self.template_cache.popitem(last=False)
+
+    # Every pattern needs some literal text to be present before it can match, so a
+    # few substring checks decide which (if any) regex is worth running. Candidates
+    # are still tried in the original order, which keeps the results identical.
+    # With a `counts` dict, every regex that is run counts a hit or a miss.
     @staticmethod
-    def evaluate_combat_log_line(line):
-        match = CombatLogParser.OtherPlayerExpression.match(line)
-        if match:
-            target = match.group("target")
-            actor = match.group("actor")
-            damage = int(match.group("damage").replace(",", ""))
-            skill = match.group("skill")
-            critical = "critical" in match.group("critical").lower()
-            return (actor, damage, target, skill, critical)
-
-        match = CombatLogParser.YouExpression.match(line)
-        if match:
-            target = match.group("target")
-            damage = int(match.group("damage").replace(",", ""))
-            skill = match.group("skill")
-            critical = "critical" in match.group("critical").lower()
-            return ("You", damage, target, skill, critical)
-
-        match = CombatLogParser.ReceivedExpression1.match(line)
-        if match:
-            actor = match.group("actor")
-            damage = int(match.group("damage").replace(",", ""))
-            skill = match.group("skill")
-            return (actor, damage, "You", skill, False)
-
-        match = CombatLogParser.ReceivedExpression2.match(line)
-        if match:
-            actor = match.group("actor")
-            damage = int(match.group("damage").replace(",", ""))
-            skill = match.group("skill")
-            return (actor, damage, "You", skill, False)
-
-        match = CombatLogParser.BlockedExpression.match(line)
-        if match:
-            actor = match.group("actor")
-            damage = int(match.group("damage").replace(",", ""))
-            skill = match.group("skill")
-            return (actor, damage, "You", skill, False)
+    def evaluate_combat_log_line(line, counts=None):
+        has_possessive = "&apos;s " in line
+
+        if has_possessive and " received " in line:
+            match = CombatLogParser.OtherPlayerExpression.match(line)
+            if counts is not None:
+                counts["parser.other_player." + ("hit" if match else "miss")] += 1
+            if match:
+                target = match.group("target")
+                actor = match.group("actor")
+                damage = int(match.group("damage").replace(",", ""))
+                skill = match.group("skill")
+                critical = match.group("critical") == "Critical Damage"
+                return (actor, damage, target, skill, critical)
+
+        if " hit " in line and " for " in line:
+            match = CombatLogParser.YouExpression.match(line)
+            if counts is not None:
+                counts["parser.you." + ("hit" if match else "miss")] += 1
+            if match:
+                target = match.group("target")
+                damage = int(match.group("damage").replace(",", ""))
+                skill = match.group("skill")
+                critical = match.group("critical") == "critically hit"
+                return ("You", damage, target, skill, critical)
+
+        if not has_possessive:
+            if counts is not None:
+                counts["parser.unmatched"] += 1
+            return None
+
+        if line.startswith("Received "):
+            match = CombatLogParser.ReceivedExpression1.match(line)
+            if counts is not None:
+                counts["parser.received." + ("hit" if match else "miss")] += 1
+            if match:
+                actor = match.group("actor")
+                damage = int(match.group("damage").replace(",", ""))
+                skill = match.group("skill")
+                return (actor, damage, "You", skill, False)
+
+        if " inflicted " in line:
+            match = CombatLogParser.ReceivedExpression2.match(line)
+            if counts is not None:
+                counts["parser.inflicted." + ("hit" if match else "miss")] += 1
+            if match:
+                actor = match.group("actor")
+                damage = int(match.group("damage").replace(",", ""))
+                skill = match.group("skill")
+                return (actor, damage, "You", skill, False)
+
+        if line.startswith("Blocked "):
+            match = CombatLogParser.BlockedExpression.match(line)
+            if counts is not None:
+                counts["parser.blocked." + ("hit" if match else "miss")] += 1
+            if match:
+                actor = match.group("actor")
+                damage = int(match.group("damage").replace(",", ""))
+                skill = match.group("skill")
+                return (actor, damage, "You", skill, False)
 
+        if counts is not None:
+            counts["parser.unmatched"] += 1
         return None
@@ -1,17 +1,46 @@
-import requests
-from io import BytesIO
-from PIL import Image, ImageTk
 import tkinter as tk
 from tkinter import ttk
 from datetime import datetime
 import ctypes
+import logging
+import os
+import time
+from asset_loader import AssetLoader
+from instrumentation import METRICS
+from paths import data_dir
+
+log = logging.getLogger(__name__)
+
+class RowItems:
+    # Canvas item ids of one DPS bar row, plus what they currently show
+    __slots__ = ("bar", "icon", "name_shadow", "name", "dps_shadow", "dps", "bar_width", "icon_image", "dps_text")
+
+    def __init__(self):
+        self.bar_width = None
+        self.icon_image = None
+        self.dps_text = None
+
 
 class DPSWindow(tk.Tk):
     BAR_HEIGHT = 30
     BAR_MAX_WIDTH = 270
     BAR_SPACING = 4
-
-    def __init__(self, aggregator):
+    IDLE_REFRESH = 1.0  # seconds; DPS keeps moving with the clock even without new hits
+
+    # Class name -> (bundled file, remote copy used only if the file is missing)
+    CLASS_ICONS = {
+        "Blade Master": ("blademaster.png", "https://i.imgur.com/B40HVay.jpg"),
+        "Blade Dancer": ("bladedancer.png", "https://i.imgur.com/Efuw2We.jpg"),
+        "Assassin": ("assassin.png", "https://i.imgur.com/eCPTk91.jpg"),
+        "Destroyer": ("destroyer.png", "https://i.imgur.com/FN6joij.jpg"),
+        "Force Master": ("forcemaster.png", "https://i.imgur.com/6cVHqqd.jpg"),
+        "Kung Fu Fighter": ("kungfufighter.png", "https://i.imgur.com/J4Rm0ot.jpg"),
+        "Summoner": ("summoner.png", "https://i.imgur.com/bA2F5Ng.jpg"),
+    }
+    ASSET_URL = "https://raw.githubusercontent.com/NoahNaki/dps-meter/main/assets/"
+
+    def __init__(self, aggregator, frame_rate=10):
+        started = time.perf_counter()
         super().__init__()
 
         # -----------------------------
@@ -32,9 +61,14 @@ class DPSWindow(tk.Tk):
         self._initial_width = 300
         self._initial_height = 350
 
-        # Default out-of-combat threshold (seconds) and last combat timestamp
-        self.out_of_combat_threshold = 30  # default threshold seconds
-        self.last_combat_time = datetime.now()
+        # Redraws are coalesced to at most frame_rate per second, and only
+        # happen when the aggregator published a new snapshot (or IDLE_REFRESH
+        # passed). pending_version is written from the worker thread.
+        self.frame_rate = frame_rate
+        self.pending_version = None
+        self.drawn_version = None
+        self.drawn_hit = None
+        self.last_draw = 0.0
 
         # -----------------------------
         # 2) CUSTOM TITLE BAR
@@ -56,41 +90,15 @@ class DPSWindow(tk.Tk):
         self.title_label.pack(side="left", padx=10)
 
         # -----------------------------
-        # 3) LOAD ICONS FROM URLS
+        # 3) ICONS
         # -----------------------------
-        def load_image_from_url(url, size=None):
-            headers = {"User-Agent": "Mozilla/5.0"}  # Mimic a browser
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            image_data = BytesIO(response.content)
-            pil_image = Image.open(image_data)
-            if size:
-                pil_image = pil_image.resize(size, Image.Resampling.LANCZOS)
-            return pil_image
-
-        gear_url = "https://raw.githubusercontent.com/NoahNaki/dps-meter/main/assets/gear.png"
-        info_url = "https://raw.githubusercontent.com/NoahNaki/dps-meter/main/assets/infobubble.png"
-        cross_url = "https://raw.githubusercontent.com/NoahNaki/dps-meter/main/assets/cross.png"
-        bin_url   = "https://raw.githubusercontent.com/NoahNaki/dps-meter/main/assets/bin.png"
-
-        try:
-            cogwheel_pil = load_image_from_url(gear_url, size=(16, 16))
-            self.cogwheel_img = ImageTk.PhotoImage(cogwheel_pil)
-
-            info_pil = load_image_from_url(info_url, size=(16, 16))
-            self.info_img = ImageTk.PhotoImage(info_pil)
-
-            x_pil = load_image_from_url(cross_url, size=(16, 16))
-            self.x_img = ImageTk.PhotoImage(x_pil)
-
-            bin_pil = load_image_from_url(bin_url, size=(16, 16))
-            self.data_cleaning_img = ImageTk.PhotoImage(bin_pil)
-        except Exception as e:
-            print(f"[DEBUG] Failed to load one of the icons: {e}")
-            self.cogwheel_img = None
-            self.info_img = None
-            self.x_img = None
-            self.data_cleaning_img = None
+        # Buttons start out with blank placeholders; the real icons are read
+        # from assets/ and decoded in the background, then swapped in
+        self.assets = AssetLoader(self)
+        self.cogwheel_img = self.assets.placeholder((16, 16))
+        self.info_img = self.assets.placeholder((16, 16))
+        self.x_img = self.assets.placeholder((16, 16))
+        self.data_cleaning_img = self.assets.placeholder((16, 16))
 
         # -----------------------------
         # 4) TITLE BAR BUTTONS
@@ -139,10 +147,16 @@ class DPSWindow(tk.Tk):
         )
         self.reset_png_button.pack(side="right", padx=5)
 
+        for name, button in (("gear.png", self.cogwheel_button), ("infobubble.png", self.info_button),
+                             ("cross.png", self.close_button), ("bin.png", self.reset_png_button)):
+            self.assets.load(name, (16, 16), lambda image, b=button: b.configure(image=image),
+                             url=self.ASSET_URL + name)
+
         # -----------------------------
         # 5) AGGREGATOR & THEMING
         # -----------------------------
         self.aggregator = aggregator
+        self.aggregator.add_listener(self.on_stats_published)
         self.dark_mode = True
         self.bg_color = "#23242b"
         self.bar_color = "#db8d43"
@@ -158,10 +172,12 @@ class DPSWindow(tk.Tk):
         self.dps_frame = tk.Frame(self, bg=self.bg_color)
         self.detailed_frame = tk.Frame(self, bg=self.bg_color)
         self.settings_frame = tk.Frame(self, bg=self.bg_color)  # New settings frame
+        self.diagnostics_frame = tk.Frame(self, bg=self.bg_color)
 
         self.build_dps_ui(self.dps_frame)
         self.build_detailed_ui(self.detailed_frame)
         self.build_settings_ui(self.settings_frame)
+        self.build_diagnostics_ui(self.diagnostics_frame)
 
         # Show only the DPS frame by default
         self.dps_frame.pack(fill="both", expand=True)
@@ -178,6 +194,7 @@ class DPSWindow(tk.Tk):
         self.resizer.bind("<B1-Motion>", self.on_resize)
 
         self.update_ui()
+        log.info("Window built in %.0f ms", (time.perf_counter() - started) * 1000)
 
     # -----------------------------
     # 8) DRAGGABLE TITLE BAR
@@ -192,6 +209,7 @@ class DPSWindow(tk.Tk):
         self.geometry(f"+{x}+{y}")
 
     def close_window(self):
+        self.aggregator.remove_listener(self.on_stats_published)
         self.destroy()
 
     def minimize_window(self):
@@ -207,6 +225,7 @@ class DPSWindow(tk.Tk):
         menu.add_command(label="Detailed Tab", command=self.switch_to_detailed)
         menu.add_separator()
         menu.add_command(label="Settings", command=self.switch_to_settings)
+        menu.add_command(label="Diagnostics", command=self.switch_to_diagnostics)
         menu.add_separator()
 
         try:
@@ -221,20 +240,31 @@ class DPSWindow(tk.Tk):
     def switch_to_settings(self):
         self.dps_frame.pack_forget()
         self.detailed_frame.pack_forget()
+        self.diagnostics_frame.pack_forget()
         self.settings_frame.pack(fill="both", expand=True)
         self.geometry("300x350")
 
     def switch_to_dps_meter(self):
         self.detailed_frame.pack_forget()
         self.settings_frame.pack_forget()
+        self.diagnostics_frame.pack_forget()
         self.dps_frame.pack(fill="both", expand=True)
         self.geometry("300x350")
 
     def switch_to_detailed(self):
         self.dps_frame.pack_forget()
         self.settings_frame.pack_forget()
+        self.diagnostics_frame.pack_forget()
         self.detailed_frame.pack(fill="both", expand=True)
-        self.geometry("700x350")
+        self.geometry("860x350")
+
+    def switch_to_diagnostics(self):
+        self.dps_frame.pack_forget()
+        self.detailed_frame.pack_forget()
+        self.settings_frame.pack_forget()
+        self.diagnostics_frame.pack(fill="both", expand=True)
+        self.geometry("720x420")
+        self.refresh_diagnostics()
 
     # -----------------------------
     # 10) BUILD THE DPS UI
@@ -246,59 +276,24 @@ class DPSWindow(tk.Tk):
         self.rows_frame = tk.Frame(container, bg=self.bg_color)
         self.rows_frame.pack(side="top", fill="both", expand=True, padx=10, pady=5)
 
-        self.row_widgets = {}
+        self.row_widgets = {}  # actor -> (row frame, canvas, RowItems)
+        self.row_order = []
         self.class_icons = self.load_class_icons()
 
     # -----------------------------
-    # 11) CLASS ICONS FROM URLS
+    # 11) CLASS ICONS
     # -----------------------------
     def load_class_icons(self):
-        def load_image_from_url(url, size=None):
-            response = requests.get(url)
-            response.raise_for_status()
-            image_data = BytesIO(response.content)
-            pil_image = Image.open(image_data)
-            if size:
-                pil_image = pil_image.resize(size, Image.Resampling.LANCZOS)
-            return pil_image
+        # Filled in as the loader finishes each icon; bars without one just
+        # draw the name flush left until then
+        icons = {}
+        for class_name, (name, url) in self.CLASS_ICONS.items():
+            self.assets.load(name, (32, 32), lambda image, c=class_name: self.set_class_icon(c, image), url=url)
+        return icons
 
-        try:
-            bm_url = "https://i.imgur.com/B40HVay.jpg"
-            bd_url = "https://i.imgur.com/Efuw2We.jpg"
-            as_url = "https://i.imgur.com/eCPTk91.jpg"
-            de_url = "https://i.imgur.com/FN6joij.jpg"
-            fm_url = "https://i.imgur.com/6cVHqqd.jpg"
-            kf_url = "https://i.imgur.com/J4Rm0ot.jpg"
-            su_url = "https://i.imgur.com/bA2F5Ng.jpg"
-
-            bm_pil = load_image_from_url(bm_url, size=(32, 32))
-            bd_pil = load_image_from_url(bd_url, size=(32, 32))
-            as_pil = load_image_from_url(as_url, size=(32, 32))
-            de_pil = load_image_from_url(de_url, size=(32, 32))
-            fm_pil = load_image_from_url(fm_url, size=(32, 32))
-            kf_pil = load_image_from_url(kf_url, size=(32, 32))
-            su_pil = load_image_from_url(su_url, size=(32, 32))
-
-            bm_icon = ImageTk.PhotoImage(bm_pil)
-            bd_icon = ImageTk.PhotoImage(bd_pil)
-            as_icon = ImageTk.PhotoImage(as_pil)
-            de_icon = ImageTk.PhotoImage(de_pil)
-            fm_icon = ImageTk.PhotoImage(fm_pil)
-            kf_icon = ImageTk.PhotoImage(kf_pil)
-            su_icon = ImageTk.PhotoImage(su_pil)
-
-            return {
-                "Blade Master": bm_icon,
-                "Blade Dancer": bd_icon,
-                "Assassin": as_icon,
-                "Destroyer": de_icon,
-                "Force Master": fm_icon,
-                "Kung Fu Fighter": kf_icon,
-                "Summoner": su_icon
-            }
-        except Exception as e:
-            print(f"[DEBUG] Error loading class icons: {e}")
-            return {}
+    def set_class_icon(self, class_name, image):
+        self.class_icons[class_name] = image
+        self.drawn_version = None  # redraw so existing bars pick the icon up
 
     # -----------------------------
     # 12) BUILD THE SETTINGS UI
@@ -321,51 +316,148 @@ class DPSWindow(tk.Tk):
         self.opacity_scale.set(1.0)
         self.opacity_scale.pack(pady=10, padx=10, fill="x")
 
-        ooc_label = ttk.Label(container, text="Out-of-Combat Reset (sec):", style="CustomLabel.TLabel")
-        ooc_label.pack(pady=(20, 0))
+        idle_gap_label = ttk.Label(container, text="New Encounter After Idle (sec):", style="CustomLabel.TLabel")
+        idle_gap_label.pack(pady=(20, 0))
 
-        self.ooc_scale = tk.Scale(
+        self.idle_gap_scale = tk.Scale(
             container,
             from_=1,
             to=120,
             resolution=1,
             orient="horizontal",
-            command=self.update_out_of_combat_threshold,
+            command=self.update_idle_gap,
+            bg=self.bg_color,
+            fg=self.text_color,
+            highlightbackground=self.bg_color
+        )
+        self.idle_gap_scale.set(int(self.aggregator.idle_gap))
+        self.idle_gap_scale.pack(pady=10, padx=10, fill="x")
+
+        fps_label = ttk.Label(container, text="Refresh Rate (fps):", style="CustomLabel.TLabel")
+        fps_label.pack(pady=(20, 0))
+
+        self.fps_scale = tk.Scale(
+            container,
+            from_=1,
+            to=30,
+            resolution=1,
+            orient="horizontal",
+            command=self.update_frame_rate,
             bg=self.bg_color,
             fg=self.text_color,
             highlightbackground=self.bg_color
         )
-        self.ooc_scale.set(self.out_of_combat_threshold)
-        self.ooc_scale.pack(pady=10, padx=10, fill="x")
+        self.fps_scale.set(self.frame_rate)
+        self.fps_scale.pack(pady=10, padx=10, fill="x")
+
+    def update_idle_gap(self, value):
+        # Read by the aggregator's writer on its next flush
+        try:
+            self.aggregator.idle_gap = float(value)
+        except Exception as e:
+            log.warning("Error updating encounter idle gap: %s", e)
 
-    def update_out_of_combat_threshold(self, value):
+    def update_frame_rate(self, value):
         try:
-            self.out_of_combat_threshold = int(value)
+            self.frame_rate = max(1, int(value))
         except Exception as e:
-            print("Error updating out-of-combat threshold:", e)
+            log.warning("Error updating frame rate: %s", e)
 
     # -----------------------------
     # 13) BUILD THE DETAILED UI
     # -----------------------------
     def build_detailed_ui(self, container):
-        columns = ("Name", "DPS", "Duration", "%Damage", "Crit%", "Highest Hit")
+        # Which encounter the table shows: the live one, or a frozen one from the history
+        self.encounter_choice = tk.StringVar(value=self.LIVE_ENCOUNTER)
+        self.encounter_picker = ttk.Combobox(container, textvariable=self.encounter_choice, state="readonly",
+                                             values=(self.LIVE_ENCOUNTER,))
+        self.encounter_picker.pack(side="top", fill="x", padx=10, pady=(10, 0))
+        self.encounter_picker.bind("<<ComboboxSelected>>", self.select_encounter)
+        self.listed_encounters = ()
+        self.encounter_labels = {}
+        self.viewed_encounter = None
+
+        columns = ("Name", "DPS", "DPS 10s", "Peak DPS", "Duration", "%Damage", "Crit%", "Highest Hit")
         self.detailed_tree = ttk.Treeview(container, style="Custom.Treeview", columns=columns, show="headings", height=10)
         self.detailed_tree.pack(fill="both", expand=True, padx=10, pady=10)
 
-        self.detailed_tree.heading("Name", text="Name")
-        self.detailed_tree.heading("DPS", text="DPS")
-        self.detailed_tree.heading("Duration", text="Duration")
-        self.detailed_tree.heading("%Damage", text="% Damage")
-        self.detailed_tree.heading("Crit%", text="Crit %")
-        self.detailed_tree.heading("Highest Hit", text="Highest Hit")
+        # Keyed row model: actor -> [item id, raw values last shown], plus the
+        # order the rows are currently in. Clicking a heading sorts by it.
+        self.detail_rows = {}
+        self.detail_order = []
+        self.detail_sort_column = "DPS"
+        self.detail_sort_reverse = True
+
+        headings = {
+            "Name": "Name",
+            "DPS": "DPS",
+            "DPS 10s": "DPS (10s)",
+            "Peak DPS": "Peak DPS",
+            "Duration": "Duration",
+            "%Damage": "% Damage",
+            "Crit%": "Crit %",
+            "Highest Hit": "Highest Hit",
+        }
+        for column, text in headings.items():
+            self.detailed_tree.heading(column, text=text, command=lambda c=column: self.sort_detailed_by(c))
 
         self.detailed_tree.column("Name", width=100, anchor="center")
         self.detailed_tree.column("DPS", width=80, anchor="center")
+        self.detailed_tree.column("DPS 10s", width=80, anchor="center")
+        self.detailed_tree.column("Peak DPS", width=80, anchor="center")
         self.detailed_tree.column("Duration", width=80, anchor="center")
         self.detailed_tree.column("%Damage", width=80, anchor="center")
         self.detailed_tree.column("Crit%", width=60, anchor="center")
         self.detailed_tree.column("Highest Hit", width=80, anchor="center")
 
+    # -----------------------------
+    # 13b) BUILD THE DIAGNOSTICS UI
+    # -----------------------------
+    def build_diagnostics_ui(self, container):
+        controls = tk.Frame(container, bg=self.bg_color)
+        controls.pack(side="top", fill="x", padx=10, pady=(10, 0))
+
+        self.metrics_enabled = tk.BooleanVar(value=METRICS.enabled)
+        ttk.Checkbutton(controls, text="Collect metrics", variable=self.metrics_enabled,
+                        command=self.toggle_metrics, style="CustomCheckbutton.TCheckbutton").pack(side="left")
+        ttk.Button(controls, text="Dump to file", command=self.dump_metrics,
+                   style="Accent.TButton").pack(side="right")
+        ttk.Button(controls, text="Clear", command=self.clear_metrics,
+                   style="Accent.TButton").pack(side="right", padx=5)
+
+        self.diagnostics_text = tk.Text(container, bg=self.bg_color, fg=self.text_color, font=("Consolas", 9),
+                                        borderwidth=0, highlightthickness=0, wrap="none")
+        self.diagnostics_text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.diagnostics_text.configure(state="disabled")
+        self.last_diagnostics_refresh = 0.0
+
+    def toggle_metrics(self):
+        METRICS.enabled = self.metrics_enabled.get()
+        self.refresh_diagnostics()
+
+    def clear_metrics(self):
+        METRICS.reset()
+        self.refresh_diagnostics()
+
+    def dump_metrics(self):
+        path = os.path.join(data_dir("diagnostics"), f"metrics-{datetime.now():%Y%m%d-%H%M%S}.json")
+        try:
+            METRICS.dump(path)
+            log.info("Metrics written to %s", path)
+        except Exception as e:
+            log.warning("Failed to write metrics: %s", e)
+
+    def refresh_diagnostics(self):
+        self.last_diagnostics_refresh = time.monotonic()
+        text = self.diagnostics_text
+        text.configure(state="normal")
+        text.delete("1.0", tk.END)
+        if METRICS.enabled or METRICS.histograms or METRICS.counters:
+            text.insert(tk.END, "\n".join(METRICS.format_lines()))
+        else:
+            text.insert(tk.END, "Metrics are off. Tick \"Collect metrics\" to start measuring.")
+        text.configure(state="disabled")
+
     # -----------------------------
     # 14) THEMING & UI UPDATES
     # -----------------------------
@@ -424,7 +516,7 @@ class DPSWindow(tk.Tk):
         self.update_dps_area_theme()
 
     def update_dps_area_theme(self):
-        for actor, (row_frame, canvas) in getattr(self, "row_widgets", {}).items():
+        for actor, (row_frame, canvas, items) in getattr(self, "row_widgets", {}).items():
             row_frame.configure(bg=self.bg_color)
             canvas.configure(bg=self.bg_color)
 
@@ -433,32 +525,42 @@ class DPSWindow(tk.Tk):
             alpha = float(value)
             self.attributes("-alpha", alpha)
         except Exception as e:
-            print("Error updating opacity:", e)
+            log.warning("Error updating opacity: %s", e)
 
     # -----------------------------
     # 15) MAIN UPDATE LOOP
     # -----------------------------
+    def on_stats_published(self, snapshot):
+        # Called on the worker thread: only note the version, the Tk loop picks it up
+        self.pending_version = snapshot.version
+
     def update_ui(self):
-        try:
-            stats = self.aggregator.get_stats()
-        except Exception as e:
-            error_message = str(e)
-            print(f"[DEBUG] Error reading memory: {error_message}")
-            if "Failed to revalidate pointer chain" in error_message:
-                print("[DEBUG] Attempting to rebind memory addresses...")
-                try:
-                    # Attempt to rebind the memory addresses
-                    self.aggregator.rebind_memory()
-                    # Try getting the stats again after rebinding
-                    stats = self.aggregator.get_stats()
-                except Exception as rebind_exception:
-                    print(f"[DEBUG] Rebinding failed: {rebind_exception}")
-                    stats = {}
+        now = time.monotonic()
+        if self.pending_version != self.drawn_version or now - self.last_draw >= self.IDLE_REFRESH:
+            self.last_draw = now
+            if METRICS.enabled:
+                self.redraw()
+                METRICS.observe("ui.frame", time.monotonic() - now)
             else:
-                stats = {}
-
-        now = datetime.now()
-        duration = (now - self.aggregator.global_start_time).total_seconds() if self.aggregator.global_start_time else 0
+                self.redraw()
+        if self.diagnostics_frame.winfo_manager() and now - self.last_diagnostics_refresh >= 1.0:
+            self.refresh_diagnostics()
+        self.after(max(1, int(1000 / self.frame_rate)), self.update_ui)
+
+    def redraw(self):
+        snapshot = self.aggregator.get_snapshot()
+        self.drawn_version = snapshot.version
+        stats = snapshot.stats
+
+        # A finished encounter stays on screen until the next hit; its duration
+        # stops at its last hit instead of growing with the clock
+        encounters = self.aggregator.get_encounters()
+        if encounters and encounters[-1].id == snapshot.encounter:
+            duration = encounters[-1].duration
+        elif snapshot.global_start_time:
+            duration = (datetime.now() - snapshot.global_start_time).total_seconds()
+        else:
+            duration = 0
 
         sorted_actors = sorted(
             stats.items(),
@@ -467,23 +569,21 @@ class DPSWindow(tk.Tk):
         )
         max_damage = max((data["total_damage"] for _, data in sorted_actors), default=1)
 
-        if any(data.get("events", 0) > 0 for _, data in sorted_actors):
-            self.last_combat_time = now
-            print(f"[DEBUG] Combat detected. Updating last_combat_time to {self.last_combat_time}.")
-        else:
-            time_since_last_combat = (now - self.last_combat_time).total_seconds()
-            print(f"[DEBUG] No combat activity. Time since last combat: {time_since_last_combat:.2f} seconds.")
-            if time_since_last_combat >= self.out_of_combat_threshold:
-                print(f"[DEBUG] Out-of-combat threshold reached ({time_since_last_combat:.2f} seconds). Resetting meter.")
-                self.reset_meter()
-                self.last_combat_time = now
-
         self.update_dps_tab(sorted_actors, max_damage, duration)
 
+        if encounters is not self.listed_encounters:
+            self.update_encounter_picker(encounters)
         if self.detailed_frame.winfo_manager():
-            self.update_detailed_tab(sorted_actors, duration)
+            if self.viewed_encounter is None:
+                self.update_detailed_tab(sorted_actors, duration)
+            else:
+                # Frozen summary: after the first draw this is a no-op diff
+                self.update_detailed_tab(list(self.viewed_encounter.stats.items()), self.viewed_encounter.duration)
 
-        self.after(1000, self.update_ui)
+        # Measured from the poll that read the newest hit, counted once per hit
+        if METRICS.enabled and snapshot.newest_hit is not None and snapshot.newest_hit != self.drawn_hit:
+            METRICS.observe("ui.hit_to_screen", time.time() - snapshot.newest_hit)
+        self.drawn_hit = snapshot.newest_hit
 
 
     # -----------------------------
@@ -494,7 +594,7 @@ class DPSWindow(tk.Tk):
         existing_actors = set(self.row_widgets.keys())
 
         for actor in existing_actors - current_actors:
-            frame, canvas = self.row_widgets[actor]
+            frame, canvas, items = self.row_widgets[actor]
             frame.destroy()
             del self.row_widgets[actor]
 
@@ -509,108 +609,175 @@ class DPSWindow(tk.Tk):
                     bg=self.bg_color
                 )
                 c.pack(side="top")
-                self.row_widgets[actor] = (row_frame, c)
+                items = self.create_row_items(c, actor)
+                self.row_widgets[actor] = (row_frame, c, items)
             else:
-                row_frame, c = self.row_widgets[actor]
-                row_frame.configure(bg=self.bg_color)
-                c.configure(bg=self.bg_color)
-                c.delete("all")
+                row_frame, c, items = self.row_widgets[actor]
 
             total_damage = data["total_damage"]
             ratio = total_damage / max_damage if max_damage > 0 else 0
             bar_width = max(1, int(ratio * self.BAR_MAX_WIDTH))
             dps = total_damage / duration if duration > 0 else 0
-
-            DPSWindow.create_rounded_rectangle(c, 0, 0, bar_width, self.BAR_HEIGHT,
-                                               radius=1, fill=self.bar_color, outline="")
-
-            actor_class = data.get("class", None)
-            if actor_class and actor_class in self.class_icons:
-                c.create_image(0, self.BAR_HEIGHT // 2, anchor="w", image=self.class_icons[actor_class])
+            self.update_row_items(c, items, bar_width, data.get("class", None), f"{int(dps):,}/sec")
+
+        # Repacking every row is what makes the list flicker, only do it when the order changed
+        order = [actor for actor, _ in sorted_actors]
+        if order != self.row_order:
+            for actor in order:
+                self.row_widgets[actor][0].pack_forget()
+            for idx, actor in enumerate(order):
+                row_frame = self.row_widgets[actor][0]
+                row_frame.pack(fill="x", pady=(0 if idx == 0 else self.BAR_SPACING))
+            self.row_order = order
+
+    def create_row_items(self, c, actor):
+        # Every canvas item of a row is created once; later frames only move
+        # and reconfigure them
+        items = RowItems()
+        items.bar = DPSWindow.create_rounded_rectangle(c, 0, 0, 1, self.BAR_HEIGHT,
+                                                       radius=1, fill=self.bar_color, outline="")
+        items.icon = c.create_image(0, self.BAR_HEIGHT // 2, anchor="w", state="hidden")
+
+        text_offset_x = 5
+        font = ("Roboto", 10, "bold")
+        items.name_shadow = c.create_text(text_offset_x + 1, self.BAR_HEIGHT // 2 + 1, anchor="w",
+                                          text=actor, fill="black", font=font)
+        items.name = c.create_text(text_offset_x, self.BAR_HEIGHT // 2, anchor="w",
+                                   text=actor, fill=self.text_color, font=font)
+
+        dps_text_x = self.BAR_MAX_WIDTH - 5
+        dps_text_y = self.BAR_HEIGHT // 2
+        items.dps_shadow = c.create_text(dps_text_x + 1, dps_text_y + 1, anchor="e",
+                                         text="", fill="black", font=font)
+        items.dps = c.create_text(dps_text_x, dps_text_y, anchor="e",
+                                  text="", fill=self.dps_text_color, font=font)
+        return items
+
+    def update_row_items(self, c, items, bar_width, actor_class, dps_text):
+        # Each Tk call is skipped unless what it draws actually changed
+        if bar_width != items.bar_width:
+            DPSWindow.move_rounded_rectangle(c, items.bar, 0, 0, bar_width, self.BAR_HEIGHT, radius=1)
+            items.bar_width = bar_width
+
+        icon = self.class_icons.get(actor_class) if actor_class else None
+        if icon is not items.icon_image:
+            if icon is not None:
+                c.itemconfigure(items.icon, image=icon, state="normal")
                 text_offset_x = 40
             else:
+                c.itemconfigure(items.icon, state="hidden")
                 text_offset_x = 5
+            c.coords(items.name_shadow, text_offset_x + 1, self.BAR_HEIGHT // 2 + 1)
+            c.coords(items.name, text_offset_x, self.BAR_HEIGHT // 2)
+            items.icon_image = icon
 
-            outline_offsets = [(1, 1)]
-            for dx, dy in outline_offsets:
-                c.create_text(
-                    text_offset_x + dx,
-                    self.BAR_HEIGHT // 2 + dy,
-                    anchor="w",
-                    text=actor,
-                    fill="black",
-                    font=("Roboto", 10, "bold")
-                )
-            c.create_text(
-                text_offset_x,
-                self.BAR_HEIGHT // 2,
-                anchor="w",
-                text=actor,
-                fill=self.text_color,
-                font=("Roboto", 10, "bold")
-            )
-
-            dps_text = f"{int(dps):,}/sec"
-            dps_text_x = self.BAR_MAX_WIDTH - 5
-            dps_text_y = self.BAR_HEIGHT // 2
-            for dx, dy in outline_offsets:
-                c.create_text(
-                    dps_text_x + dx,
-                    dps_text_y + dy,
-                    anchor="e",
-                    text=dps_text,
-                    fill="black",
-                    font=("Roboto", 10, "bold")
-                )
-            c.create_text(
-                dps_text_x,
-                dps_text_y,
-                anchor="e",
-                text=dps_text,
-                fill=self.dps_text_color,
-                font=("Roboto", 10, "bold")
-            )
-
-        for idx, (actor, data) in enumerate(sorted_actors):
-            row_frame, _ = self.row_widgets[actor]
-            row_frame.pack_forget()
-            row_frame.pack(fill="x", pady=(0 if idx == 0 else self.BAR_SPACING))
+        if dps_text != items.dps_text:
+            c.itemconfigure(items.dps_shadow, text=dps_text)
+            c.itemconfigure(items.dps, text=dps_text)
+            items.dps_text = dps_text
 
     # -----------------------------
     # 17) DETAILED TAB
     # -----------------------------
-    def update_detailed_tab(self, sorted_actors, duration):
-        for item in self.detailed_tree.get_children():
-            self.detailed_tree.delete(item)
+    LIVE_ENCOUNTER = "Current encounter"
+
+    def encounter_label(self, summary):
+        started = datetime.fromtimestamp(summary.start_time)
+        minutes, seconds = divmod(int(summary.duration), 60)
+        return f"#{summary.id}  {started:%H:%M:%S}  {minutes}:{seconds:02d}  {summary.total_damage:,} damage"
+
+    def update_encounter_picker(self, encounters):
+        # Newest first, after the live entry
+        self.listed_encounters = encounters
+        self.encounter_labels = {self.encounter_label(summary): summary for summary in encounters}
+        self.encounter_picker.configure(values=(self.LIVE_ENCOUNTER,) + tuple(reversed(list(self.encounter_labels))))
+
+    def select_encounter(self, event=None):
+        self.viewed_encounter = self.encounter_labels.get(self.encounter_choice.get())
+        self.drawn_version = None  # redraw the table on the next tick
 
+    # Position of each sortable column in the raw row tuple built below
+    DETAIL_SORT_KEYS = {"DPS": 0, "DPS 10s": 1, "Peak DPS": 2, "Duration": 3, "%Damage": 4, "Crit%": 5,
+                        "Highest Hit": 6}
+
+    def update_detailed_tab(self, sorted_actors, duration):
+        tree = self.detailed_tree
+        rows = self.detail_rows
         total_damage_all = sum(data["total_damage"] for _, data in sorted_actors)
 
+        seen = set()
         for actor, data in sorted_actors:
             total_damage = data["total_damage"]
             events = data["events"]
             crit_events = data["crit_events"]
-            highest_hit = data.get("highest_hit", 0)
 
             dps = total_damage / duration if duration > 0 else 0
             dmg_percent = (total_damage / total_damage_all * 100) if total_damage_all > 0 else 0
             crit_percent = (crit_events / events * 100) if events > 0 else 0
 
-            duration_str = f"{int(duration)}s" if duration > 0 else "0s"
-            dmg_percent_str = f"{dmg_percent:.1f}%"
-            crit_percent_str = f"{crit_percent:.1f}%"
-
-            self.detailed_tree.insert(
-                "",
-                tk.END,
-                values=(
-                    actor,
-                    f"{int(dps):,}",
-                    duration_str,
-                    dmg_percent_str,
-                    crit_percent_str,
-                    f"{highest_hit:,}"
-                )
+            # Rounded the way they're displayed, so a row is only reformatted
+            # when its text would actually change
+            raw = (
+                int(dps),
+                int(data.get("dps_10s", 0)),
+                int(data.get("peak_dps", 0)),
+                int(duration) if duration > 0 else 0,
+                round(dmg_percent, 1),
+                round(crit_percent, 1),
+                data.get("highest_hit", 0),
             )
+            seen.add(actor)
+            row = rows.get(actor)
+            if row is None:
+                row = rows[actor] = [tree.insert("", tk.END), None]
+            if raw != row[1]:
+                tree.item(row[0], values=self.format_detailed_row(actor, raw))
+                row[1] = raw
+
+        for actor in [actor for actor in rows if actor not in seen]:
+            tree.delete(rows.pop(actor)[0])
+
+        self.order_detailed_rows()
+
+    def format_detailed_row(self, actor, raw):
+        dps, dps_10s, peak_dps, duration, dmg_percent, crit_percent, highest_hit = raw
+        return (
+            actor,
+            f"{dps:,}",
+            f"{dps_10s:,}",
+            f"{peak_dps:,}",
+            f"{duration}s",
+            f"{dmg_percent:.1f}%",
+            f"{crit_percent:.1f}%",
+            f"{highest_hit:,}"
+        )
+
+    def order_detailed_rows(self):
+        rows = self.detail_rows
+        index = self.DETAIL_SORT_KEYS.get(self.detail_sort_column)
+        if index is None:
+            order = sorted(rows, key=str.lower, reverse=self.detail_sort_reverse)
+        else:
+            order = sorted(rows, key=lambda actor: rows[actor][1][index], reverse=self.detail_sort_reverse)
+        if order == self.detail_order:
+            return
+        # Only rows whose rank changed are moved
+        current = list(self.detailed_tree.get_children())
+        for rank, actor in enumerate(order):
+            item = rows[actor][0]
+            if current[rank] != item:
+                self.detailed_tree.move(item, "", rank)
+                current.remove(item)
+                current.insert(rank, item)
+        self.detail_order = order
+
+    def sort_detailed_by(self, column):
+        if column == self.detail_sort_column:
+            self.detail_sort_reverse = not self.detail_sort_reverse
+        else:
+            self.detail_sort_column = column
+            self.detail_sort_reverse = column != "Name"
+        self.order_detailed_rows()
 
     # -----------------------------
     # 18) RESET METER
@@ -618,25 +785,39 @@ class DPSWindow(tk.Tk):
     def reset_meter(self):
         self.aggregator.reset()
         for actor in list(self.row_widgets.keys()):
-            frame, canvas = self.row_widgets[actor]
+            frame, canvas, items = self.row_widgets[actor]
             frame.destroy()
             del self.row_widgets[actor]
+        self.row_order = []
 
     # -----------------------------
     # 19) ROUNDED RECTANGLE UTILITY
     # -----------------------------
     def create_rounded_rectangle(canvas, x1, y1, x2, y2, radius=10, **kwargs):
+        # Returns the item ids so the shape can be moved later
+        radius = min(radius, abs(x2 - x1) // 2, abs(y2 - y1) // 2)
+        return [
+            canvas.create_arc(x1, y1, x1 + 2 * radius, y1 + 2 * radius,
+                              start=90, extent=90, style="pieslice", **kwargs),
+            canvas.create_arc(x2 - 2 * radius, y1, x2, y1 + 2 * radius,
+                              start=0, extent=90, style="pieslice", **kwargs),
+            canvas.create_arc(x2 - 2 * radius, y2 - 2 * radius, x2, y2,
+                              start=270, extent=90, style="pieslice", **kwargs),
+            canvas.create_arc(x1, y2 - 2 * radius, x1 + 2 * radius, y2,
+                              start=180, extent=90, style="pieslice", **kwargs),
+            canvas.create_rectangle(x1 + radius, y1, x2 - radius, y2, **kwargs),
+            canvas.create_rectangle(x1, y1 + radius, x2, y2 - radius, **kwargs),
+        ]
+
+    def move_rounded_rectangle(canvas, items, x1, y1, x2, y2, radius=10):
         radius = min(radius, abs(x2 - x1) // 2, abs(y2 - y1) // 2)
-        canvas.create_arc(x1, y1, x1 + 2 * radius, y1 + 2 * radius,
-                          start=90, extent=90, style="pieslice", **kwargs)
-        canvas.create_arc(x2 - 2 * radius, y1, x2, y1 + 2 * radius,
-                          start=0, extent=90, style="pieslice", **kwargs)
-        canvas.create_arc(x2 - 2 * radius, y2 - 2 * radius, x2, y2,
-                          start=270, extent=90, style="pieslice", **kwargs)
-        canvas.create_arc(x1, y2 - 2 * radius, x1 + 2 * radius, y2,
-                          start=180, extent=90, style="pieslice", **kwargs)
-        canvas.create_rectangle(x1 + radius, y1, x2 - radius, y2, **kwargs)
-        canvas.create_rectangle(x1, y1 + radius, x2, y2 - radius, **kwargs)
+        top_left, top_right, bottom_right, bottom_left, horizontal, vertical = items
+        canvas.coords(top_left, x1, y1, x1 + 2 * radius, y1 + 2 * radius)
+        canvas.coords(top_right, x2 - 2 * radius, y1, x2, y1 + 2 * radius)
+        canvas.coords(bottom_right, x2 - 2 * radius, y2 - 2 * radius, x2, y2)
+        canvas.coords(bottom_left, x1, y2 - 2 * radius, x1 + 2 * radius, y2)
+        canvas.coords(horizontal, x1 + radius, y1, x2 - radius, y2)
+        canvas.coords(vertical, x1, y1 + radius, x2, y2 - radius)
 
     # -----------------------------
     # 20) CUSTOM RESIZE HANDLERS
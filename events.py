@@ -0,0 +1,40 @@
+class SymbolTable:
+    # Interns actor, target and skill names to small integer ids. Ids are handed
+    # out in order and never reused, so they stay valid for the whole session.
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        symbol_id = self.ids.get(name)
+        if symbol_id is None:
+            symbol_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = symbol_id
+        return symbol_id
+
+    def lookup(self, name):
+        return self.ids.get(name)
+
+    def name(self, symbol_id):
+        return self.names[symbol_id]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CombatEvent:
+    # One parsed hit. actor/target/skill are SymbolTable ids, timestamp is time.time()
+    __slots__ = ("actor", "target", "skill", "damage", "critical", "timestamp")
+
+    def __init__(self, actor, target, skill, damage, critical, timestamp):
+        self.actor = actor
+        self.target = target
+        self.skill = skill
+        self.damage = damage
+        self.critical = critical
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return (f"CombatEvent(actor={self.actor}, target={self.target}, skill={self.skill}, "
+                f"damage={self.damage}, critical={self.critical}, timestamp={self.timestamp})")
@@ -0,0 +1,196 @@
+import bisect
+import random
+import struct
+import threading
+import time
+
+from memory_reader import MemoryReader, MemorySource
+
+
+class FakeProcessImage(MemorySource):
+    # Sparse in-memory address space. Each mapped region is a bytearray; reads
+    # that fall outside a single region fail just like an unmapped page would.
+    def __init__(self, base_address=0x140000000):
+        self.base_address = base_address
+        self._starts = []
+        self._regions = []
+        self.read_calls = 0
+        self.bytes_read = 0
+
+    def get_base_address(self):
+        return self.base_address
+
+    def map(self, address, size_or_data):
+        region = bytearray(size_or_data)
+        idx = bisect.bisect_right(self._starts, address)
+        if idx > 0 and self._starts[idx - 1] + len(self._regions[idx - 1]) > address:
+            raise Exception(f"Region at 0x{address:016X} overlaps an existing mapping")
+        if idx < len(self._starts) and address + len(region) > self._starts[idx]:
+            raise Exception(f"Region at 0x{address:016X} overlaps an existing mapping")
+        self._starts.insert(idx, address)
+        self._regions.insert(idx, region)
+        return region
+
+    def _locate(self, address, size):
+        idx = bisect.bisect_right(self._starts, address) - 1
+        if idx < 0:
+            return None, 0
+        offset = address - self._starts[idx]
+        region = self._regions[idx]
+        if offset + size > len(region):
+            return None, 0
+        return region, offset
+
+    def write(self, address, data):
+        region, offset = self._locate(address, len(data))
+        if region is None:
+            raise Exception(f"Write to unmapped memory at 0x{address:016X}")
+        region[offset:offset + len(data)] = data
+
+    def write_pointer(self, address, value):
+        self.write(address, struct.pack("Q", value))
+
+    def read(self, address, size):
+        self.read_calls += 1
+        region, offset = self._locate(address, size)
+        if region is None:
+            return None
+        self.bytes_read += size
+        return bytes(region[offset:offset + size])
+
+    def read_into(self, address, buffer, offset, size):
+        self.read_calls += 1
+        region, start = self._locate(address, size)
+        if region is None:
+            return False
+        self.bytes_read += size
+        buffer[offset:offset + size] = memoryview(region)[start:start + size]
+        return True
+
+    def reset_counters(self):
+        self.read_calls = 0
+        self.bytes_read = 0
+
+
+def encode_entry(line, size=MemoryReader.ENTRY_SIZE):
+    data = line.encode("utf-16le")[:size - 2]
+    return data + b"\x00" * (size - len(data))
+
+
+def map_pointer_chain(image, offsets, ring_length, node_address=0x1F000000000):
+    # Maps the nodes of the game's pointer chain and the ring's pointer table
+    # the way MemoryReader walks them. Returns the table address.
+    image.map(image.base_address + offsets[0], 8)
+    current = image.base_address + offsets[0]
+    for offset in offsets[1:-1]:
+        image.write_pointer(current, node_address)
+        image.map(node_address, offset + 8)
+        current = node_address + offset
+        node_address += 0x100000
+    table_address = node_address
+    image.write_pointer(current, table_address)
+    image.map(table_address, ring_length * offsets[-1])
+    return table_address
+
+
+def build_combat_log_image(lines, offsets=MemoryReader.OFFSETS, ring_length=MemoryReader.COMBAT_LOG_LENGTH,
+                           entry_size=MemoryReader.ENTRY_SIZE, heap_address=0x2A000000000, seed=1):
+    # A static snapshot of the ring. Entries are spread over a heap region in
+    # shuffled order with small allocator-style gaps between them.
+    image = FakeProcessImage()
+    table_address = map_pointer_chain(image, offsets, ring_length)
+    entry_stride = offsets[-1]
+
+    rng = random.Random(seed)
+    slot_size = entry_size + 0x20
+    heap = image.map(heap_address, ring_length * slot_size)
+    heap_slots = list(range(ring_length))
+    rng.shuffle(heap_slots)
+    for slot, line in enumerate(lines[:ring_length]):
+        if line is None:
+            continue
+        entry_address = heap_address + heap_slots[slot] * slot_size
+        offset = entry_address - heap_address
+        heap[offset:offset + entry_size] = encode_entry(line, entry_size)
+        image.write_pointer(table_address + slot * entry_stride, entry_address)
+    return image
+
+
+ACTORS = ["Mira", "Kaelen", "Shiro", "Yuna", "Doran", "Velka", "Arin", "Sable", "Tomo", "Lirae"]
+TARGETS = ["Ashen Knight", "Naryu Guardian", "Hexed Wolf"]
+
+
+def generate_combat_lines(seed=1):
+    # Endless stream of lines in the formats CombatLogParser understands
+    from skill_map import SKILL_TO_CLASS
+    rng = random.Random(seed)
+    skills = list(SKILL_TO_CLASS)
+    while True:
+        actor, target, skill = rng.choice(ACTORS), rng.choice(TARGETS), rng.choice(skills)
+        damage = f"{rng.randint(100, 99999):,}"
+        kind = rng.random()
+        if kind < 0.6:
+            hit = "Critical Damage" if rng.random() < 0.3 else "damage"
+            yield f"{target} received {damage} {hit} from {actor}&apos;s {skill}."
+        elif kind < 0.9:
+            verb = "critically hit" if rng.random() < 0.3 else "hit"
+            yield f"{skill} {verb} {target} for {damage} damage."
+        else:
+            yield f"Received {damage} damage from {target}&apos;s Cleave."
+
+
+class SimulatedGameProcess(FakeProcessImage):
+    # Stand-in for a running BNSR.exe: the pointer chain at MemoryReader.OFFSETS
+    # and a ring of UTF-16 entries that a generator thread appends to at
+    # `lines_per_second`. Like the game, every new line gets a fresh heap entry,
+    # so entry pointers change as the ring wraps.
+    def __init__(self, lines_per_second=50.0, lines=None, offsets=MemoryReader.OFFSETS,
+                 ring_length=MemoryReader.COMBAT_LOG_LENGTH, entry_size=MemoryReader.ENTRY_SIZE,
+                 heap_address=0x2A000000000, heap_entries=4096):
+        super().__init__()
+        self.lines_per_second = lines_per_second
+        self.lines = lines if lines is not None else generate_combat_lines()
+        self.ring_length = ring_length
+        self.entry_size = entry_size
+        self.entry_stride = offsets[-1]
+        self.table_address = map_pointer_chain(self, offsets, ring_length)
+        self.heap_address = heap_address
+        self.heap_entries = heap_entries
+        self.slot_size = entry_size + 0x20
+        self.heap = self.map(heap_address, heap_entries * self.slot_size)
+
+        self.head = -1
+        self.lines_written = 0
+        self.write_times = []  # time.perf_counter() at which line n was written
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def write_line(self, line):
+        self.head = (self.head + 1) % self.ring_length
+        heap_slot = self.lines_written % self.heap_entries
+        offset = heap_slot * self.slot_size
+        self.heap[offset:offset + self.entry_size] = encode_entry(line, self.entry_size)
+        # Payload first, then publish the pointer, so a reader never sees a half-written entry
+        self.write_pointer(self.table_address + self.head * self.entry_stride, self.heap_address + offset)
+        self.lines_written += 1
+        self.write_times.append(time.perf_counter())
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="simulated-game", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        started = time.perf_counter()
+        written = 0
+        while not self.stop_event.wait(0.005):
+            due = int((time.perf_counter() - started) * self.lines_per_second)
+            while written < due:
+                self.write_line(next(self.lines))
+                written += 1
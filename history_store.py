@@ -0,0 +1,170 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from paths import data_dir
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS encounters (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    duration REAL NOT NULL,
+    total_damage INTEGER NOT NULL,
+    actors INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS actor_stats (
+    encounter_id INTEGER NOT NULL REFERENCES encounters(id),
+    started REAL NOT NULL,
+    actor TEXT NOT NULL,
+    class TEXT,
+    total_damage INTEGER NOT NULL,
+    dps REAL NOT NULL,
+    peak_dps REAL NOT NULL,
+    events INTEGER NOT NULL,
+    crit_events INTEGER NOT NULL,
+    highest_hit INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS encounters_started ON encounters(started);
+CREATE INDEX IF NOT EXISTS actor_stats_actor ON actor_stats(actor, started);
+CREATE INDEX IF NOT EXISTS actor_stats_class ON actor_stats(class, started);
+CREATE INDEX IF NOT EXISTS actor_stats_encounter ON actor_stats(encounter_id);
+"""
+
+ACTOR_COLUMNS = "encounter_id, started, actor, class, total_damage, dps, peak_dps, events, crit_events, highest_hit"
+
+_STOP = object()
+
+
+class HistoryStore:
+    # One summary row per finished encounter and one per actor in it, in a
+    # local SQLite file. record() only queues the EncounterSummary; a background
+    # thread owns the write connection so the worker never waits on the disk.
+    # Queries open their own connection per calling thread.
+    def __init__(self, path=None):
+        self.path = path if path is not None else os.path.join(data_dir(), "history.sqlite3")
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        writer = self.connect()
+        writer.executescript(SCHEMA)
+        writer.close()
+        self.thread = threading.Thread(target=self.run, name="history-store", daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=5.0)
+        connection.row_factory = sqlite3.Row
+        # WAL lets the UI query while the writer commits
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def reader(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connect()
+        return connection
+
+    def record(self, summary):
+        self.queue.put(summary)
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def run(self):
+        connection = self.connect()
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                connection.close()
+                return
+            try:
+                self.write(connection, [item])
+            except Exception as e:
+                log.exception("Failed to store encounter %s: %s", getattr(item, "id", "?"), e)
+
+    def write(self, connection, summaries):
+        with connection:
+            for summary in summaries:
+                cursor = connection.execute(
+                    "INSERT INTO encounters (started, ended, duration, total_damage, actors) VALUES (?, ?, ?, ?, ?)",
+                    (summary.start_time, summary.end_time, summary.duration, summary.total_damage,
+                     len(summary.stats))
+                )
+                encounter_id = cursor.lastrowid
+                connection.executemany(
+                    f"INSERT INTO actor_stats ({ACTOR_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(encounter_id, summary.start_time, actor, data["class"], data["total_damage"], data["dps"],
+                      data["peak_dps"], data["events"], data["crit_events"], data["highest_hit"])
+                     for actor, data in summary.stats.items()]
+                )
+
+    def import_summaries(self, summaries):
+        # Synchronous bulk insert, for backfills and benchmarks
+        connection = self.connect()
+        try:
+            self.write(connection, summaries)
+        finally:
+            connection.close()
+
+    def best_pulls(self, actor, since=None, until=None, limit=10):
+        # An actor's highest-DPS encounters, e.g. "best pull this week"
+        return self.query_actor_stats("actor = ?", (actor,), since, until, "dps DESC", limit)
+
+    def best_by_class(self, class_name, since=None, until=None, limit=10):
+        return self.query_actor_stats("class = ?", (class_name,), since, until, "dps DESC", limit)
+
+    def actor_history(self, actor, since=None, until=None, limit=100):
+        return self.query_actor_stats("actor = ?", (actor,), since, until, "started DESC", limit)
+
+    def query_actor_stats(self, where, params, since, until, order, limit):
+        params = list(params)
+        if since is not None:
+            where += " AND started >= ?"
+            params.append(since)
+        if until is not None:
+            where += " AND started < ?"
+            params.append(until)
+        params.append(limit)
+        rows = self.reader().execute(
+            f"SELECT {ACTOR_COLUMNS} FROM actor_stats WHERE {where} ORDER BY {order} LIMIT ?", params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def encounters(self, since=None, until=None, limit=100):
+        where, params = "1", []
+        if since is not None:
+            where += " AND started >= ?"
+            params.append(since)
+        if until is not None:
+            where += " AND started < ?"
+            params.append(until)
+        params.append(limit)
+        rows = self.reader().execute(
+            f"SELECT * FROM encounters WHERE {where} ORDER BY started DESC LIMIT ?", params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def encounter_actors(self, encounter_id):
+        rows = self.reader().execute(
+            f"SELECT {ACTOR_COLUMNS} FROM actor_stats WHERE encounter_id = ? ORDER BY dps DESC", (encounter_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def week_start(now=None):
+    # time.time() of the most recent Monday 00:00 local time
+    now = time.time() if now is None else now
+    local = time.localtime(now)
+    midnight = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+    return midnight - local.tm_wday * 86400
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+# Latency histograms use power-of-two buckets over microseconds: bucket i holds
+# samples in [2^(i-1), 2^i) us, bucket 0 everything under 1 us
+BUCKETS = 40
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = int(seconds * 1e6)
+        self.buckets[min(BUCKETS - 1, micros.bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the requested sample, in seconds
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, samples in enumerate(self.buckets):
+            seen += samples
+            if seen >= rank:
+                return min(self.max, (1 << index) / 1e6)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Metrics:
+    # Process-wide counters and latency histograms. Disabled by default: every
+    # call site checks `enabled` first, so the only cost left is that attribute
+    # read. Each metric has a single writer thread, so updates aren't locked;
+    # snapshot() may see a sample half-recorded, which is fine for diagnostics.
+    def __init__(self):
+        self.enabled = False
+        self.started = time.time()
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        self.reset_lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def observe(self, name, seconds):
+        self.histograms[name].record(seconds)
+
+    def reset(self):
+        with self.reset_lock:
+            self.counters = defaultdict(int)
+            self.histograms = defaultdict(Histogram)
+            self.started = time.time()
+
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "collecting_for": time.time() - self.started,
+            "counters": dict(sorted(list(self.counters.items()))),
+            "histograms": {name: histogram.as_dict() for name, histogram in sorted(list(self.histograms.items()))},
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+        return path
+
+    def format_lines(self):
+        # Human readable form used by the diagnostics panel
+        snapshot = self.snapshot()
+        lines = [f"Collecting for {snapshot['collecting_for']:.0f}s", ""]
+        for name, histogram in snapshot["histograms"].items():
+            lines.append(f"{name:<30}{histogram['count']:>8} x  avg {histogram['avg_ms']:7.2f}  "
+                         f"p50 {histogram['p50_ms']:7.2f}  p99 {histogram['p99_ms']:7.2f}  "
+                         f"max {histogram['max_ms']:7.2f} ms")
+        if snapshot["histograms"]:
+            lines.append("")
+        for name, value in snapshot["counters"].items():
+            lines.append(f"{name:<30}{value:>12,}")
+        return lines
+
+
+METRICS = Metrics()
@@ -0,0 +1,113 @@
+import argparse
+import threading
+import time
+import tracemalloc
+
+from aggregator import Aggregator
+from combat_log_parser import CombatLogParser
+from events import SymbolTable
+from fake_process import SimulatedGameProcess
+from instrumentation import METRICS
+from memory_reader import MemoryReader
+from poll_scheduler import AdaptivePollScheduler
+from worker import combat_log_worker
+
+NORMAL_RATE = 50  # lines/sec of a busy party fight
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(lines_per_second, duration, min_interval=0.05, max_interval=1.0, trace_memory=False):
+    # Runs the real worker against a simulated game and measures how long each
+    # line takes from being written into the ring to showing up in a snapshot
+    game = SimulatedGameProcess(lines_per_second=lines_per_second)
+    symbols = SymbolTable()
+    reader = MemoryReader(source=game)
+    aggregator = Aggregator(symbols)
+    scheduler = AdaptivePollScheduler(min_interval=min_interval, max_interval=max_interval)
+    stop_event = threading.Event()
+    worker_thread = threading.Thread(
+        target=combat_log_worker,
+        args=(reader, CombatLogParser(symbols), aggregator, stop_event, scheduler),
+        daemon=True
+    )
+
+    if trace_memory:
+        tracemalloc.start()
+    worker_thread.start()
+    time.sleep(0.2)  # let the worker take its baseline of the empty ring
+    game.start()
+
+    latencies = []
+    counted = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        time.sleep(0.002)
+        now = time.perf_counter()
+        total = sum(data["events"] for data in aggregator.get_stats().values())
+        write_times = game.write_times
+        for index in range(counted, min(total, len(write_times))):
+            latencies.append(now - write_times[index])
+        counted = max(counted, total)
+
+    game.stop()
+    generating = time.perf_counter() - started
+    time.sleep(max_interval + 0.1)  # let the worker drain what is left in the ring
+    stop_event.set()
+    worker_thread.join()
+    memory = tracemalloc.get_traced_memory() if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    aggregated = sum(data["events"] for data in aggregator.get_stats().values())
+    latencies.sort()
+    return {
+        "rate": lines_per_second,
+        "written": game.lines_written,
+        "aggregated": aggregated,
+        "dropped": game.lines_written - aggregated,
+        "throughput": aggregated / generating,
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": latencies[-1] if latencies else 0.0,
+        "poll_stats": scheduler.get_stats(),
+        "memory": memory,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the reader -> worker -> aggregator pipeline with a "
+                                                 "simulated game process.")
+    parser.add_argument("--multipliers", default="1,10,100",
+                        help=f"comma separated multiples of the normal rate ({NORMAL_RATE} lines/sec)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--trace-memory", action="store_true", help="report Python heap usage (slower)")
+    parser.add_argument("--metrics", action="store_true", help="print per-stage latency metrics for each run")
+    args = parser.parse_args(argv)
+    METRICS.enabled = args.metrics
+
+    for multiplier in (float(m) for m in args.multipliers.split(",")):
+        result = run_load(NORMAL_RATE * multiplier, args.duration, trace_memory=args.trace_memory)
+        polls = result["poll_stats"]
+        print(f"{multiplier:>5g}x ({result['rate']:,.0f} lines/sec): {result['aggregated']:,} of "
+              f"{result['written']:,} lines aggregated ({result['dropped']:,} dropped), "
+              f"{result['throughput']:,.0f} lines/sec")
+        print(f"        latency p50 {result['latency_p50'] * 1000:.1f} ms, p99 {result['latency_p99'] * 1000:.1f} ms, "
+              f"max {result['latency_max'] * 1000:.1f} ms; {polls['polls']} polls, "
+              f"avg {polls['avg_poll_time'] * 1000:.2f} ms, max {polls['max_poll_time'] * 1000:.2f} ms")
+        if result["memory"]:
+            current, peak = result["memory"]
+            print(f"        heap {current / 1024:,.0f} KiB, peak {peak / 1024:,.0f} KiB")
+        if args.metrics:
+            for line in METRICS.format_lines():
+                print(f"        {line}")
+            METRICS.reset()
+
+
+if __name__ == "__main__":
+    main()
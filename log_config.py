@@ -0,0 +1,40 @@
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+def configure_logging(level="INFO", log_file=None, file_level="DEBUG"):
+    # Console output at `level`. With log_file, records at `file_level` are also
+    # written to a rotating file from a background thread: the logging call only
+    # enqueues the record, so tracing to disk doesn't slow down the caller.
+    # Returns the QueueListener to stop at exit, or None.
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    console = logging.StreamHandler()
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(console)
+    levels = [console.level]
+
+    listener = None
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=3,
+                                                            encoding="utf-8")
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        records = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(records)
+        queue_handler.setLevel(file_level)
+        root.addHandler(queue_handler)
+        levels.append(queue_handler.level)
+        listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+        listener.start()
+
+    # The root level is the cheapest filter: loggers below it bail out in
+    # isEnabledFor() before a record is even created
+    root.setLevel(min(levels))
+    return listener
@@ -1,33 +1,175 @@
-import sys
+import time
+
+STARTED = time.perf_counter()  # taken before anything else is imported
+
+import argparse
+import logging
 import threading
-from memory_reader import MemoryReader
-from combat_log_parser import CombatLogParser
-from aggregator import Aggregator
-from dps_window import DPSWindow
-from worker import combat_log_worker
 
-def main():
-    try:
-        reader = MemoryReader()
-    except Exception as e:
-        print("Error initializing MemoryReader:", e)
-        sys.exit(1)
+log = logging.getLogger(__name__)
+
+PROCESS_RETRY = 2.0  # seconds between attempts to find the game process
+IDLE_FLUSH = 0.1  # seconds between aggregator flushes while there is no game to read
+STARTUP_MILESTONES = ("process discovery", "asset load", "first frame")  # what watch_startup waits for
+
+
+class StartupProfile:
+    # Milestones in seconds since the interpreter reached main.py. Only the
+    # first mark of each name counts; marks may come from any thread.
+    def __init__(self, started=STARTED):
+        self.started = started
+        self.marks = {}
+        self.lock = threading.Lock()
+
+    def mark(self, name, when=None):
+        with self.lock:
+            self.marks.setdefault(name, time.perf_counter() if when is None else when)
+
+    def has(self, name):
+        return name in self.marks
+
+    def report(self, expected=()):
+        # Milestones in `expected` that were never marked are listed as such
+        with self.lock:
+            marks = sorted(self.marks.items(), key=lambda item: item[1])
+        print("Startup timing:")
+        previous = self.started
+        for name, when in marks:
+            print(f"  {name:<22}{(when - self.started) * 1000:>8.1f} ms  (+{(when - previous) * 1000:.1f} ms)")
+            previous = when
+        for name in expected:
+            if not self.has(name):
+                print(f"  {name:<22}not reached")
+
+
+def run_worker(parser, aggregator, stop_event, scheduler, recorder, profile):
+    # Finds the game while the window is already up, then becomes the worker
+    from memory_reader import MemoryReader
+    from worker import combat_log_worker
 
-    parser = CombatLogParser()
-    aggregator = Aggregator()
+    reader = None
+    next_attempt = 0.0
+    while not stop_event.is_set():
+        if time.perf_counter() >= next_attempt:
+            try:
+                reader = MemoryReader()
+                profile.mark("process discovery")
+                break
+            except Exception as e:
+                log.warning("Error initializing MemoryReader: %s", e)
+                next_attempt = time.perf_counter() + PROCESS_RETRY
+        # Already the aggregator's writer: UI resets and the idle-gap close of
+        # the last encounter must not wait for the game to come back
+        try:
+            aggregator.flush()
+        except Exception as e:
+            log.warning("Error publishing combat stats: %s", e)
+        stop_event.wait(IDLE_FLUSH)
+    if reader is not None:
+        combat_log_worker(reader, parser, aggregator, stop_event, scheduler, recorder)
+
+
+def watch_startup(app, profile, exit_when_done, deadline):
+    # Polled from the Tk loop until every milestone is in, or the deadline
+    # passes (no game running) and the missing ones are reported as such
+    if app.assets.ready_time is not None:
+        profile.mark("asset load", app.assets.ready_time)
+    done = all(profile.has(name) for name in STARTUP_MILESTONES)
+    if done or time.perf_counter() > deadline:
+        profile.report(STARTUP_MILESTONES)
+        if exit_when_done:
+            app.close_window()
+        return
+    app.after(50, watch_startup, app, profile, exit_when_done, deadline)
+
+
+def main(argv=None):
+    args_parser = argparse.ArgumentParser(description="DreadDPS meter")
+    args_parser.add_argument("--profile-startup", action="store_true",
+                             help="print a startup timing breakdown and exit once the meter is up")
+    args_parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                             help="console log level")
+    args_parser.add_argument("--log-file", help="also write DEBUG logs to this file, from a background thread")
+    args_parser.add_argument("--diagnostics", action="store_true",
+                             help="collect latency metrics from startup (see the Diagnostics tab)")
+    args_parser.add_argument("--reader-process", action="store_true",
+                             help="read and parse the combat log in a separate process instead of a thread")
+    args_parser.add_argument("--shared-snapshot", nargs="?", const="dreaddps-stats", metavar="NAME",
+                             help="publish live stats into a named shared memory segment for other programs")
+    args_parser.add_argument("--serve", nargs="?", type=int, const=8765, metavar="PORT",
+                             help="serve live stats over HTTP/WebSocket (overlay page at http://host:PORT/)")
+    args_parser.add_argument("--serve-host", default="127.0.0.1",
+                             help="interface for --serve; 0.0.0.0 makes it reachable from the LAN")
+    args = args_parser.parse_args(argv)
+
+    from log_config import configure_logging
+    log_listener = configure_logging(args.log_level, args.log_file)
+    if args.diagnostics:
+        from instrumentation import METRICS
+        METRICS.enabled = True
+
+    profile = StartupProfile()
+
+    # Heavy modules (tkinter, the parser's regexes) are only imported here,
+    # psutil only once the worker looks for the game
+    from combat_log_parser import CombatLogParser
+    from aggregator import Aggregator
+    from events import SymbolTable
+    from dps_window import DPSWindow
+    from poll_scheduler import AdaptivePollScheduler
+    from recorder import EncounterRecorder
+    from history_store import HistoryStore
+    from paths import data_dir
+    profile.mark("import")
+
+    # Parser and aggregator share one table of interned actor/target/skill names
+    symbols = SymbolTable()
+    parser = CombatLogParser(symbols)
+    aggregator = Aggregator(symbols)
+    shared_snapshot = None
+    if args.shared_snapshot:
+        from shared_snapshot import SharedSnapshotWriter
+        shared_snapshot = SharedSnapshotWriter(args.shared_snapshot, rolling_windows=aggregator.rolling_windows)
+        aggregator.add_listener(shared_snapshot.on_snapshot)
+    stats_server = None
+    if args.serve:
+        from stats_server import StatsServer
+        stats_server = StatsServer(aggregator, args.serve_host, args.serve)
+        stats_server.start()
 
     # Create and reset the UI
     app = DPSWindow(aggregator)
     app.reset_meter()
     aggregator.reset()
+    profile.mark("window")
+    app.after_idle(profile.mark, "first frame")
+
+    # Poll every 50 ms while lines are coming in, back off to 1 s when idle
+    scheduler = AdaptivePollScheduler(min_interval=0.05, max_interval=1.0)
+
+    # Every parsed hit is also streamed to disk, one file pair per encounter
+    recorder = EncounterRecorder(data_dir("encounters"))
+
+    # Finished encounters are summarized into the history database
+    history = HistoryStore()
+    aggregator.add_encounter_listener(history.record)
 
     stop_event = threading.Event()
-    worker_thread = threading.Thread(
-        target=combat_log_worker,
-        args=(reader, parser, aggregator, stop_event),
-        daemon=True
-    )
-    worker_thread.start()
+    if args.reader_process:
+        # The child has its own parser and scheduler; `parser` stays unused
+        from process_pipeline import ReaderProcess
+        reader_process = ReaderProcess(aggregator, recorder, profile, min_interval=scheduler.min_interval,
+                                       max_interval=scheduler.max_interval, log_level=args.log_level)
+        reader_process.start()
+        worker_thread = reader_process.thread
+    else:
+        worker_thread = threading.Thread(
+            target=run_worker,
+            args=(parser, aggregator, stop_event, scheduler, recorder, profile),
+            daemon=True
+        )
+        worker_thread.start()
+    app.after(50, watch_startup, app, profile, args.profile_startup, time.perf_counter() + 30)
 
     try:
         app.mainloop()
@@ -35,7 +177,24 @@ def main():
         pass
     finally:
         stop_event.set()
-        print("Exiting Combat Log service.")
+        if args.reader_process:
+            reader_process.stop()
+        worker_thread.join(timeout=2)
+        if not worker_thread.is_alive():
+            # The worker was the aggregator's writer; keep the last fight too
+            aggregator.close_encounter()
+        history.close()
+        if shared_snapshot is not None:
+            shared_snapshot.close()
+        if stats_server is not None:
+            stats_server.stop()
+        recorder.close()
+        log.info("Exiting Combat Log service.")
+        if log_listener is not None:
+            log_listener.stop()
 
 if __name__ == "__main__":
+    # The reader process is spawned from this script, also when frozen
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -1,46 +1,73 @@
 import ctypes
+import logging
 import struct
-import psutil
-from ctypes import wintypes
+import sys
+import time
+from array import array
+
+from instrumentation import METRICS
+
+log = logging.getLogger(__name__)
 
 PROCESS_VM_READ = 0x0010
 PROCESS_QUERY_INFORMATION = 0x0400
 
-kernel32 = ctypes.windll.kernel32
-kernel32.ReadProcessMemory.argtypes = [
-    wintypes.HANDLE,
-    wintypes.LPCVOID,
-    wintypes.LPVOID,
-    ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_size_t)
-]
-kernel32.ReadProcessMemory.restype = wintypes.BOOL
+if sys.platform == "win32":
+    from ctypes import wintypes
 
-class MemoryReader:
-    PROCESS_NAME = "BNSR.exe"
-    COMBAT_LOG_LENGTH = 600
-    OFFSETS = [0x7485118, 0xA0, 0x670, 0x8]
-    POINTER_CHAIN_VALIDITY = 5  # seconds before revalidating pointer chain
+    kernel32 = ctypes.windll.kernel32
+    kernel32.ReadProcessMemory.argtypes = [
+        wintypes.HANDLE,
+        wintypes.LPCVOID,
+        wintypes.LPVOID,
+        ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_size_t)
+    ]
+    kernel32.ReadProcessMemory.restype = wintypes.BOOL
+else:
+    # Lets the reader be imported (and benchmarked against a fake image) off Windows
+    kernel32 = None
+
+
+class MemorySource:
+    # Backend interface used by MemoryReader. Implementations only need to hand
+    # back raw bytes for an address range (or None) and the main module's base.
+    def read(self, address, size):
+        raise NotImplementedError
+
+    def read_into(self, address, buffer, offset, size):
+        # Fills buffer[offset:offset + size] in place, returns False on failure.
+        # Backends that can write straight into the buffer should override this.
+        data = self.read(address, size)
+        if data is None:
+            return False
+        buffer[offset:offset + size] = data
+        return True
 
-    def __init__(self):
-        self.pid = self.get_process_id(self.PROCESS_NAME)
+    def get_base_address(self):
+        raise NotImplementedError
+
+
+class Win32MemorySource(MemorySource):
+    def __init__(self, process_name):
+        if kernel32 is None:
+            raise Exception("Reading game memory requires Windows.")
+        self.pid = self.get_process_id(process_name)
         if self.pid is None:
-            raise Exception(f"Process {self.PROCESS_NAME} not found.")
+            raise Exception(f"Process {process_name} not found.")
         self.process_handle = self.open_process(self.pid)
-        self.base_module_address = self.get_base_address(self.pid)
+        self.base_module_address = self.find_base_address(self.pid)
         if not self.base_module_address:
             raise Exception("Failed to get base module address.")
-        print(f"[DEBUG] Base module address: 0x{self.base_module_address:016X}")
-
-        # Initialize caching for the pointer chain
-        self.cached_chat_address = None
-        self.last_chain_validation = 0
+        self.bytes_read = ctypes.c_size_t(0)
+        self.buffer_addresses = {}  # id(bytearray) -> (ctypes view pinning it, address)
 
     def get_process_id(self, process_name):
+        import psutil
         for proc in psutil.process_iter(attrs=["pid", "name"]):
             try:
                 if proc.info["name"].lower() == process_name.lower():
-                    print(f"[DEBUG] Found process {process_name} with PID {proc.info['pid']}")
+                    log.info("Found process %s with PID %d", process_name, proc.info["pid"])
                     return proc.info["pid"]
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
@@ -52,7 +79,7 @@ class MemoryReader:
             raise Exception(f"Failed to open process {pid}.")
         return handle
 
-    def get_base_address(self, pid):
+    def find_base_address(self, pid):
         hProcess = self.open_process(pid)
         psapi = ctypes.WinDLL("psapi.dll")
         module_array = (ctypes.c_void_p * 1024)()
@@ -65,7 +92,10 @@ class MemoryReader:
         kernel32.CloseHandle(hProcess)
         return base_addr
 
-    def read_memory(self, address, size):
+    def get_base_address(self):
+        return self.base_module_address
+
+    def read(self, address, size):
         buffer = ctypes.create_string_buffer(size)
         bytesRead = ctypes.c_size_t(0)
         if not kernel32.ReadProcessMemory(self.process_handle, ctypes.c_void_p(address),
@@ -75,84 +105,452 @@ class MemoryReader:
             return None
         return buffer.raw
 
+    def read_into(self, address, buffer, offset, size):
+        # ReadProcessMemory straight into the caller's bytearray, no temporaries
+        pinned = self.buffer_addresses.get(id(buffer))
+        if pinned is None:
+            # The ctypes view keeps the bytearray alive and unresizable, so its address stays valid
+            view = (ctypes.c_char * len(buffer)).from_buffer(buffer)
+            pinned = self.buffer_addresses[id(buffer)] = (view, ctypes.addressof(view))
+        buffer_address = pinned[1]
+        if not kernel32.ReadProcessMemory(self.process_handle, address, buffer_address + offset,
+                                          size, ctypes.byref(self.bytes_read)):
+            return False
+        return self.bytes_read.value == size
+
+
+class MemoryReader:
+    PROCESS_NAME = "BNSR.exe"
+    COMBAT_LOG_LENGTH = 600
+    OFFSETS = [0x7485118, 0xA0, 0x670, 0x8]
+    SCAN_WINDOW = 0x20000  # bytes searched on each side of OFFSETS[0] when the chain goes stale
+    SCAN_PAGE = 0x1000
+    SCAN_RETRY = 5.0  # seconds between signature scans that found nothing
+    SCAN_SAMPLE = 8  # entries checked when deciding whether a table is the combat log
+    # The chain is only treated as permanently stale, and scanned for, after
+    # this many failed walks in a row spanning at least SCAN_STALE_AFTER seconds.
+    # Loading screens and character select break it for a while too.
+    SCAN_AFTER_FAILURES = 5
+    SCAN_STALE_AFTER = 30.0
+    ENTRY_SIZE = 512  # bytes read per combat log entry
+    MAX_BATCH_SPAN = 0x10000  # upper bound for one coalesced entry read
+    MAX_BATCH_GAP = 0x1000  # never read across more unused memory than this
+
+    def __init__(self, source=None, bulk_snapshot=True):
+        self.source = source if source is not None else Win32MemorySource(self.PROCESS_NAME)
+        self.bulk_snapshot = bulk_snapshot
+        self.base_module_address = self.source.get_base_address()
+        if not self.base_module_address:
+            raise Exception("Failed to get base module address.")
+        log.info("Base module address: 0x%016X", self.base_module_address)
+
+        # Initialize caching for the pointer chain. Each poll only rereads the
+        # final link (last_link_address) and compares it with the cached table.
+        self.offsets = list(self.OFFSETS)
+        self.cached_chat_address = None
+        self.last_link_address = None
+        self.link_buffer = bytearray(8)
+        self.cached_link = bytes(8)
+        self.last_scan = None
+        self.chain_failures = 0  # failed walks in a row
+        self.failing_since = None  # time.monotonic() of the first of them
+
+        # Preallocated buffers every poll is read into. Slot i's entry lives at
+        # arena[i * ENTRY_SIZE]; the previous poll's copy is kept for change
+        # detection and the two sets are swapped instead of reallocated.
+        length = self.COMBAT_LOG_LENGTH
+        self.table = bytearray(length * self.OFFSETS[-1])
+        self.arena = bytearray(length * self.ENTRY_SIZE)
+        self.live = array("H", bytes(2 * length))  # byte length of each entry's text, 0 if empty
+        self.prev_table = bytearray(len(self.table))
+        self.prev_arena = bytearray(len(self.arena))
+        self.prev_live = array("H", bytes(2 * length))
+        self.scratch = bytearray(self.MAX_BATCH_SPAN)  # landing area for coalesced reads
+        self.batch_plan = None  # coalesced reads for the table contents in plan_table
+        self.plan_table = bytearray(len(self.table))
+
+        # Cursor state for get_new_combat_chat_log
+        self.ring_address = None
+        self.ring_head = -1
+
+    def read_memory(self, address, size):
+        return self.source.read(address, size)
+
     def read_pointer(self, base_address, offset):
         addr = base_address + offset
         data = self.read_memory(addr, 8)
         if data is None:
             raise Exception(f"Failed to read memory at 0x{addr:016X}")
         pointer = struct.unpack("Q", data)[0]
-        hex_pointer = f"0x{pointer:016X}"
-        if not hex_pointer.startswith("0x0000"):
-            print(f"[DEBUG] Read pointer at offset 0x{offset:X}: {hex_pointer}")
+        if pointer >> 48:
+            log.debug("Read pointer at offset 0x%X: 0x%016X", offset, pointer)
         return pointer
 
 
     def resolve_pointer_chain(self):
         current_address = self.base_module_address
-        for i, offset in enumerate(self.OFFSETS[:-1]):
+        for i, offset in enumerate(self.offsets[:-1]):
             try:
+                link_address = current_address + offset
                 current_address = self.read_pointer(current_address, offset)
                 if current_address == 0:
-                    print(f"[DEBUG] Null pointer encountered at index {i} (offset: 0x{offset:X}).")
+                    log.debug("Null pointer encountered at index %d (offset: 0x%X).", i, offset)
                     raise Exception(f"Null pointer encountered at offset index {i}")
                 else:
-                    print(f"[DEBUG] Pointer at index {i} (offset: 0x{offset:X}): 0x{current_address:016X}")
+                    log.debug("Pointer at index %d (offset: 0x%X): 0x%016X", i, offset, current_address)
             except Exception as e:
-                print(f"[DEBUG] Exception at pointer index {i} (offset: 0x{offset:X}): {e}")
+                log.debug("Exception at pointer index %d (offset: 0x%X): %s", i, offset, e)
                 raise
+        self.last_link_address = link_address
         return current_address
 
+    def walk_chain(self, offsets):
+        # Quiet version of resolve_pointer_chain for the signature scan.
+        # Returns (table address, last link address) or None.
+        current_address = self.base_module_address
+        for offset in offsets[:-1]:
+            link_address = current_address + offset
+            data = self.source.read(link_address, 8)
+            if data is None:
+                return None
+            current_address = struct.unpack("Q", data)[0]
+            if not self.plausible_pointer(current_address):
+                return None
+        return current_address, link_address
+
+    @staticmethod
+    def plausible_pointer(value):
+        # Non-null, 8-byte aligned and inside the user-mode address range
+        return 0x10000 <= value < 0x800000000000 and not value & 7
+
+    def chain_intact(self):
+        # One 8-byte read: does the final link still point at the cached table?
+        if not self.source.read_into(self.last_link_address, self.link_buffer, 0, 8):
+            return False
+        return self.link_buffer == self.cached_link
 
     def get_cached_chat_address(self):
-        import time
-        # Revalidate if the cached address is too old or not set
-        if (time.time() - self.last_chain_validation > self.POINTER_CHAIN_VALIDITY or
-                self.cached_chat_address is None):
-            try:
-                self.cached_chat_address = self.resolve_pointer_chain()
-                self.last_chain_validation = time.time()
-                print(f"[DEBUG] Updated cached combat log base address: 0x{self.cached_chat_address:016X}")
-            except Exception as e:
+        if self.cached_chat_address is not None and self.chain_intact():
+            return self.cached_chat_address
+
+        # The final link moved or became unreadable: walk the whole chain again
+        if METRICS.enabled:
+            METRICS.count("reader.chain_rewalks")
+        try:
+            table_address = self.resolve_pointer_chain()
+            if self.check_ring_table(table_address) is False:
+                raise Exception(f"0x{table_address:016X} does not hold combat log entries")
+        except Exception as e:
+            log.warning("Pointer chain walk failed: %s", e)
+            table_address = self.recover_chain()
+            if table_address is None:
+                self.cached_chat_address = None
                 raise Exception("Failed to revalidate pointer chain: " + str(e))
+        self.chain_failures = 0
+        self.failing_since = None
+        self.cached_chat_address = table_address
+        self.cached_link = struct.pack("Q", table_address)
+        log.info("Updated cached combat log base address: 0x%016X", self.cached_chat_address)
         return self.cached_chat_address
 
+    def recover_chain(self):
+        # After a failed walk: the shipped OFFSETS come first, in case an earlier
+        # scan settled on something else. Only a chain that has stayed broken
+        # for a while is taken to mean a patch moved the root and gets scanned for.
+        if self.offsets != self.OFFSETS:
+            found = self.walk_chain(self.OFFSETS)
+            if found is not None and self.check_ring_table(found[0]):
+                log.warning("Combat log is back at the original offset 0x%X", self.OFFSETS[0])
+                self.offsets = list(self.OFFSETS)
+                self.last_link_address = found[1]
+                return found[0]
+
+        now = time.monotonic()
+        self.chain_failures += 1
+        if self.failing_since is None:
+            self.failing_since = now
+        if self.chain_failures < self.SCAN_AFTER_FAILURES or now - self.failing_since < self.SCAN_STALE_AFTER:
+            return None
+        return self.scan_for_chain()
+
+    def scan_for_chain(self):
+        # Bounded signature scan: every 8-byte slot within SCAN_WINDOW of the
+        # original first offset is tried as the chain's root, nearest first, and
+        # accepted only if the rest of the chain leads to a table of combat log
+        # entries. Unreadable pages are skipped. A scan that finds nothing is not
+        # repeated for SCAN_RETRY seconds.
+        now = time.monotonic()
+        if self.last_scan is not None and now - self.last_scan < self.SCAN_RETRY:
+            return None
+        self.last_scan = now
+        if METRICS.enabled:
+            METRICS.count("reader.chain_scans")
+
+        origin = self.OFFSETS[0]
+        first = max(0, (origin - self.SCAN_WINDOW) & ~(self.SCAN_PAGE - 1))
+        last = origin + self.SCAN_WINDOW
+        candidates = []
+        for page in range(first, last, self.SCAN_PAGE):
+            data = self.source.read(self.base_module_address + page, self.SCAN_PAGE)
+            if data is None:
+                continue
+            for index, value in enumerate(memoryview(data).cast("Q")):
+                if self.plausible_pointer(value):
+                    candidates.append(page + index * 8)
+        candidates.sort(key=lambda offset: abs(offset - origin))
+        log.info("Scanning %d candidate roots around offset 0x%X", len(candidates), origin)
+
+        for offset in candidates:
+            offsets = [offset] + self.offsets[1:]
+            found = self.walk_chain(offsets)
+            if found is None or not self.check_ring_table(found[0]):
+                continue
+            log.warning("Found combat log root at offset 0x%X (was 0x%X)", offset, self.offsets[0])
+            self.offsets = offsets
+            self.last_link_address = found[1]
+            self.last_scan = None
+            return found[0]
+        log.warning("Signature scan found no combat log")
+        return None
+
+    def check_ring_table(self, table_address):
+        # True if the table points at UTF-16 text entries, False if it points at
+        # something else, None if it's empty and can't tell either way
+        stride = self.offsets[-1]
+        table = self.source.read(table_address, self.COMBAT_LOG_LENGTH * stride)
+        if table is None:
+            return False
+        pointers = [struct.unpack_from("Q", table, slot * stride)[0] for slot in range(self.COMBAT_LOG_LENGTH)]
+        pointers = [ptr for ptr in pointers if ptr]
+        if not pointers:
+            return None
+        step = max(1, len(pointers) // self.SCAN_SAMPLE)
+        sample = pointers[::step][:self.SCAN_SAMPLE]
+        valid = 0
+        for ptr in sample:
+            data = self.source.read(ptr, self.ENTRY_SIZE) if self.plausible_pointer(ptr) else None
+            if data is not None:
+                text = self.read_string(data, self.ENTRY_SIZE)
+                if text and text.isprintable():
+                    valid += 1
+        return valid * 2 > len(sample)
+
     def get_combat_chat_log(self):
-        lines = []
         try:
             base_chat_address = self.get_cached_chat_address()
-            print(f"[DEBUG] Using combat log base address: 0x{base_chat_address:016X}")
-            entry_stride = self.OFFSETS[-1]
-            for i in range(self.COMBAT_LOG_LENGTH):
-                try:
-                    log_entry_ptr = self.read_pointer(base_chat_address, i * entry_stride)
-                    if log_entry_ptr != 0:
-                        raw = self.read_memory(log_entry_ptr, 512)
-                        if raw:
-                            line = self.read_string(raw, 512)
-                            period_index = line.find('.')
-                            if period_index != -1:
-                                line = line[:period_index + 1]
-                            lines.append(line)
-                        else:
-                            lines.append("")
-                    else:
-                        lines.append("")
-                except Exception as e:
-                    print(f"[DEBUG] Error reading entry {i}: {e}")
-                    lines.append("")
+            log.debug("Using combat log base address: 0x%016X", base_chat_address)
+            self.read_slots(base_chat_address)
         except Exception as ex:
+            self.cached_chat_address = None  # walk the chain again next time
             raise Exception("Error reading combat chat log: " + str(ex))
-        return lines
+        return [self.decode_slot(slot) for slot in range(self.COMBAT_LOG_LENGTH)]
+
+    def get_new_combat_chat_log(self):
+        # Lines written to the ring since the previous call, oldest first. A slot
+        # counts as new when its entry pointer or its text changed, so the same
+        # hit landing twice comes back twice. The first call (and any call after
+        # the ring moved) only takes a baseline and returns nothing.
+        try:
+            base_chat_address = self.get_cached_chat_address()
+            self.read_slots(base_chat_address)
+        except Exception as ex:
+            self.cached_chat_address = None  # walk the chain again next time
+            raise Exception("Error reading combat chat log: " + str(ex))
+
+        try:
+            if base_chat_address != self.ring_address:
+                self.ring_address = base_chat_address
+                # Until we see a write, assume the ring filled up to its last used slot
+                used = [slot for slot, length in enumerate(self.live) if length]
+                self.ring_head = used[-1] if used else self.COMBAT_LOG_LENGTH - 1
+                return []
+            if self.table == self.prev_table and self.live == self.prev_live and self.arena == self.prev_arena:
+                return []
+            changed = self.changed_slots()
+            if not changed:
+                return []
+            length = self.COMBAT_LOG_LENGTH
+            start = self.ring_head + 1
+            changed.sort(key=lambda slot: (slot - start) % length)
+            self.ring_head = changed[-1]
+            return [self.decode_slot(slot) for slot in changed]
+        finally:
+            # This poll becomes the baseline for the next one
+            self.table, self.prev_table = self.prev_table, self.table
+            self.arena, self.prev_arena = self.prev_arena, self.arena
+            self.live, self.prev_live = self.prev_live, self.live
+
+    def changed_slots(self):
+        size = self.ENTRY_SIZE
+        stride = self.OFFSETS[-1]
+        live, prev_live = self.live, self.prev_live
+        table, prev_table = memoryview(self.table), memoryview(self.prev_table)
+        arena, prev_arena = memoryview(self.arena), memoryview(self.prev_arena)
+        changed = []
+        for slot in range(self.COMBAT_LOG_LENGTH):
+            text_length = live[slot]
+            if not text_length:
+                continue
+            if text_length == prev_live[slot]:
+                entry = slot * stride
+                if table[entry:entry + stride] == prev_table[entry:entry + stride]:
+                    base = slot * size
+                    if arena[base:base + text_length] == prev_arena[base:base + text_length]:
+                        continue
+            changed.append(slot)
+        return changed
+
+    def read_slots(self, base_chat_address):
+        # Fills table, arena and live for the current poll
+        metrics = METRICS
+        started = time.perf_counter() if metrics.enabled else 0.0
+        if not self.bulk_snapshot or not self.source.read_into(base_chat_address, self.table, 0, len(self.table)):
+            # Slow path, also used when the table straddles something unreadable
+            reads, failures = self.read_slots_per_slot(base_chat_address)
+        else:
+            reads, failures = self.read_entries()
+            reads += 1
+        self.measure_entries()
+        if metrics.enabled:
+            metrics.observe("reader.read", time.perf_counter() - started)
+            metrics.count("reader.polls")
+            metrics.count("reader.reads", reads)
+            metrics.count("reader.read_failures", failures)
+
+    def read_slots_per_slot(self, base_chat_address):
+        # Original one-pointer-one-payload walk: 2 reads per slot. Returns
+        # (reads, failed reads).
+        stride = self.OFFSETS[-1]
+        size = self.ENTRY_SIZE
+        failed = 0
+        reads = self.COMBAT_LOG_LENGTH
+        payload_failures = 0
+        for i in range(self.COMBAT_LOG_LENGTH):
+            if not self.source.read_into(base_chat_address + i * stride, self.table, i * stride, stride):
+                log.debug("Error reading entry %d: failed to read pointer", i)
+                self.clear_entry(i)
+                failed += 1
+                continue
+            log_entry_ptr = self.entry_pointer(i)
+            if log_entry_ptr:
+                reads += 1
+                if not self.source.read_into(log_entry_ptr, self.arena, i * size, size):
+                    self.clear_entry(i)
+                    payload_failures += 1
+        if failed == self.COMBAT_LOG_LENGTH:
+            raise Exception(f"Combat log table at 0x{base_chat_address:016X} is unreadable")
+        return reads, failed + payload_failures
+
+    def entry_pointer(self, slot):
+        return struct.unpack_from("Q", self.table, slot * self.OFFSETS[-1])[0]
+
+    def clear_entry(self, slot):
+        # Nulls the slot's pointer in place, which is all "empty" means
+        struct.pack_into("Q", self.table, slot * self.OFFSETS[-1], 0)
+
+    def read_entries(self):
+        # Reads the payload of every non-null entry into its arena slot, merging
+        # entries that sit close together on the heap into one read. A slot whose
+        # payload can't be read gets its table entry cleared. Returns (reads,
+        # failed reads).
+        if self.batch_plan is None or self.table != self.plan_table:
+            self.batch_plan = self.coalesce_entries()
+            self.plan_table[:] = self.table
+        size = self.ENTRY_SIZE
+        arena = memoryview(self.arena)
+        scratch = memoryview(self.scratch)
+        read_into = self.source.read_into
+        reads = failures = 0
+        for start, end, members in self.batch_plan:
+            if len(members) > 1:
+                reads += 1
+                if read_into(start, self.scratch, 0, end - start):
+                    for ptr, slot in members:
+                        offset = ptr - start
+                        arena[slot * size:(slot + 1) * size] = scratch[offset:offset + size]
+                    continue
+                failures += 1
+            # Single entry, or something unmapped inside the span: one read per entry
+            for ptr, slot in members:
+                reads += 1
+                if not read_into(ptr, self.arena, slot * size, size):
+                    self.clear_entry(slot)
+                    failures += 1
+        return reads, failures
+
+    def coalesce_entries(self):
+        size = self.ENTRY_SIZE
+        stride = self.OFFSETS[-1]
+        if stride == 8:
+            entry_ptrs = memoryview(self.table).cast("Q")
+        else:
+            entry_ptrs = [self.entry_pointer(slot) for slot in range(self.COMBAT_LOG_LENGTH)]
+        ordered = sorted((ptr, slot) for slot, ptr in enumerate(entry_ptrs) if ptr)
+        batches = []
+        start = end = None
+        members = []
+        for ptr, slot in ordered:
+            if start is not None and (ptr - end > self.MAX_BATCH_GAP or
+                                      ptr + size - start > self.MAX_BATCH_SPAN):
+                batches.append((start, end, members))
+                start = None
+            if start is None:
+                start, end, members = ptr, ptr + size, []
+            members.append((ptr, slot))
+            end = max(end, ptr + size)
+        if start is not None:
+            batches.append((start, end, members))
+        return batches
+
+    def measure_entries(self):
+        # Byte length of each slot's text: up to the first NUL code unit. The
+        # terminator search only accepts even offsets so a character whose high
+        # byte is 0 followed by a NUL isn't mistaken for the end of the string.
+        size = self.ENTRY_SIZE
+        stride = self.OFFSETS[-1]
+        arena = self.arena
+        table = self.table
+        live = self.live
+        unpack_from = struct.unpack_from
+        for slot in range(self.COMBAT_LOG_LENGTH):
+            # Null pointer check without slicing (and copying) the table
+            if not unpack_from("Q", table, slot * stride)[0]:
+                live[slot] = 0
+                continue
+            base = slot * size
+            end = base + size
+            terminator = arena.find(b"\x00\x00", base, end)
+            while terminator != -1 and (terminator - base) & 1:
+                terminator = arena.find(b"\x00\x00", terminator + 1, end)
+            live[slot] = (terminator if terminator != -1 else end) - base
+
+    def decode_slot(self, slot):
+        text_length = self.live[slot]
+        if not text_length:
+            return ""
+        base = slot * self.ENTRY_SIZE
+        with memoryview(self.arena)[base:base + text_length] as view:
+            return self.decode_text(view)
+
+    def decode_text(self, data):
+        try:
+            line = str(data, "utf-16le", "ignore")
+        except Exception:
+            return ""
+        period_index = line.find('.')
+        if period_index != -1:
+            line = line[:period_index + 1]
+        return line
 
 
 
     def read_string(self, data, size):
         terminator = data.find(b'\x00\x00')
+        while terminator != -1 and terminator & 1:
+            terminator = data.find(b'\x00\x00', terminator + 1)
         if terminator != -1:
             data = data[:terminator]
         try:
             return data.decode("utf-16le", errors="ignore")
         except Exception:
             return ""
-
-
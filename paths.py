@@ -0,0 +1,16 @@
+import os
+import sys
+
+APP_NAME = "DreadDPS"
+
+
+def data_dir(*parts):
+    # Per-user writable directory for recordings, caches and history
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        path = os.path.join(root, APP_NAME, *parts)
+    else:
+        root = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        path = os.path.join(root, APP_NAME.lower(), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
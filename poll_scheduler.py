@@ -0,0 +1,58 @@
+class AdaptivePollScheduler:
+    # Decides how long the worker waits before the next poll. While lines keep
+    # arriving it polls every min_interval; each idle poll doubles the wait up to
+    # max_interval. Errors back off separately and are capped at max_error_interval.
+    def __init__(self, min_interval=0.05, max_interval=1.0, backoff=2.0,
+                 min_error_interval=0.1, max_error_interval=2.0):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Poll intervals must satisfy 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.min_error_interval = min_error_interval
+        self.max_error_interval = max_error_interval
+
+        self.interval = min_interval
+        self.error_interval = min_error_interval
+
+        # Per-poll timing stats
+        self.polls = 0
+        self.errors = 0
+        self.lines = 0
+        self.last_poll_time = 0.0
+        self.total_poll_time = 0.0
+        self.max_poll_time = 0.0
+
+    def record_poll(self, new_lines, elapsed):
+        self.polls += 1
+        self.lines += new_lines
+        self.last_poll_time = elapsed
+        self.total_poll_time += elapsed
+        if elapsed > self.max_poll_time:
+            self.max_poll_time = elapsed
+        self.error_interval = self.min_error_interval
+
+        if new_lines:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
+
+    def record_error(self):
+        self.errors += 1
+        delay = self.error_interval
+        self.error_interval = min(self.max_error_interval, self.error_interval * self.backoff)
+        # Whatever broke, start polling fast again once it recovers
+        self.interval = self.min_interval
+        return delay
+
+    def get_stats(self):
+        return {
+            "polls": self.polls,
+            "errors": self.errors,
+            "lines": self.lines,
+            "interval": self.interval,
+            "last_poll_time": self.last_poll_time,
+            "avg_poll_time": self.total_poll_time / self.polls if self.polls else 0.0,
+            "max_poll_time": self.max_poll_time,
+        }
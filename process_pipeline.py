@@ -0,0 +1,204 @@
+import logging
+import multiprocessing
+import threading
+import time
+from array import array
+
+from combat_log_parser import ParsedBatch
+
+log = logging.getLogger(__name__)
+
+PROCESS_RETRY = 2.0  # seconds between attempts to find the game process
+PUMP_INTERVAL = 0.1  # longest the UI side goes without a flush (resets, idle-gap checks)
+
+
+def reader_process(connection, stop_event, source_factory=None, min_interval=0.05, max_interval=1.0,
+                   log_level="INFO"):
+    # Child process body: owns the MemoryReader and the parser and ships each
+    # poll's hits to the UI process as one compact message. Names are interned
+    # here and only sent the first time they appear; after that a hit is five
+    # fixed-width numbers.
+    from log_config import configure_logging
+    configure_logging(log_level)
+    from combat_log_parser import CombatLogParser
+    from events import SymbolTable
+    from memory_reader import MemoryReader
+    from poll_scheduler import AdaptivePollScheduler
+
+    symbols = SymbolTable()
+    parser = CombatLogParser(symbols)
+    scheduler = AdaptivePollScheduler(min_interval=min_interval, max_interval=max_interval)
+    sent_names = 0
+
+    def poll():
+        nonlocal sent_names
+        new_lines = reader.get_new_combat_chat_log()
+        batch = parser.parse_batch(new_lines)
+        if len(batch):
+            names = symbols.names[sent_names:]
+            sent_names = len(symbols.names)
+            connection.send(("batch", names, batch.actors.tobytes(), batch.targets.tobytes(),
+                             batch.skills.tobytes(), batch.damages.tobytes(), bytes(batch.crits),
+                             batch.timestamps.tobytes()))
+        return len(new_lines)
+
+    reader = None
+    source = None
+    try:
+        while reader is None and not stop_event.is_set():
+            try:
+                source = source_factory() if source_factory is not None else None
+                reader = MemoryReader(source=source)
+                connection.send(("found",))
+            except Exception as e:
+                connection.send(("missing", str(e)))
+                stop_event.wait(PROCESS_RETRY)
+
+        while reader is not None and not stop_event.is_set():
+            poll_started = time.perf_counter()
+            try:
+                delay = scheduler.record_poll(poll(), time.perf_counter() - poll_started)
+            except (BrokenPipeError, EOFError):
+                return
+            except Exception as e:
+                log.warning("Error in reader process: %s", e)
+                delay = scheduler.record_error()
+            stop_event.wait(delay)
+
+        if reader is not None:
+            # Sources that generate lines themselves (the simulated game) are
+            # stopped first so the last poll drains everything they wrote
+            if hasattr(source, "stop"):
+                source.stop()
+            try:
+                poll()
+            except Exception as e:
+                log.warning("Error in final poll: %s", e)
+        connection.send(("stopped", {
+            "poll_stats": scheduler.get_stats(),
+            "lines_written": getattr(source, "lines_written", None),
+        }))
+    except (BrokenPipeError, EOFError):
+        pass
+    finally:
+        connection.close()
+
+
+class ReaderProcess:
+    # UI-process side of the multi-process mode. Reading and parsing run in a
+    # child process, so the ctypes calls and regexes no longer hold this
+    # process's GIL. A pump thread here receives the batches and is the
+    # aggregator's writer: snapshots stay in-process, where the Tk window reads
+    # them for free, instead of being copied across the process boundary.
+    def __init__(self, aggregator, recorder=None, profile=None, source_factory=None, min_interval=0.05,
+                 max_interval=1.0, log_level="INFO"):
+        self.aggregator = aggregator
+        self.symbols = aggregator.symbols
+        self.recorder = recorder
+        self.profile = profile
+        # spawn everywhere, so Linux behaves like the Windows build
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe(duplex=False)
+        self.child_connection = child_connection
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=reader_process,
+            args=(child_connection, self.stop_event, source_factory, min_interval, max_interval, log_level),
+            name="dps-reader",
+            daemon=True
+        )
+        self.thread = threading.Thread(target=self.pump, name="dps-reader-pump", daemon=True)
+        # child symbol id -> id in our SymbolTable. While nothing else interns
+        # into our table the ids match and batches are used as they arrive.
+        self.remap = array("I")
+        self.identity = True
+        self.batches = 0
+        self.hits = 0
+        self.child_stats = None
+        self.attached = threading.Event()
+
+    def start(self):
+        self.process.start()
+        # Only the child writes; dropping our copy lets recv() see EOF if it dies
+        self.child_connection.close()
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        self.thread.join(timeout)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            log.warning("Reader process did not exit, terminating it")
+            self.process.terminate()
+            self.process.join(timeout)
+
+    def decode(self, message):
+        _, names, actors, targets, skills, damages, crits, timestamps = message
+        remap = self.remap
+        intern = self.symbols.intern
+        for name in names:
+            symbol_id = intern(name)
+            if symbol_id != len(remap):
+                self.identity = False
+            remap.append(symbol_id)
+        batch = ParsedBatch(self.symbols)
+        batch.actors.frombytes(actors)
+        batch.targets.frombytes(targets)
+        batch.skills.frombytes(skills)
+        batch.damages.frombytes(damages)
+        batch.crits.extend(crits)
+        batch.timestamps.frombytes(timestamps)
+        if not self.identity:
+            batch.actors = array("I", [remap[i] for i in batch.actors])
+            batch.targets = array("I", [remap[i] for i in batch.targets])
+            batch.skills = array("I", [remap[i] for i in batch.skills])
+        return batch
+
+    def handle(self, message):
+        kind = message[0]
+        if kind == "batch":
+            batch = self.decode(message)
+            self.batches += 1
+            self.hits += len(batch)
+            self.aggregator.submit(batch)
+            return batch
+        if kind == "found":
+            log.info("Reader process attached to the game")
+            self.attached.set()
+            if self.profile is not None:
+                self.profile.mark("process discovery")
+        elif kind == "missing":
+            log.warning("Error initializing MemoryReader: %s", message[1])
+        elif kind == "stopped":
+            self.child_stats = message[1]
+        return None
+
+    def pump(self):
+        aggregator = self.aggregator
+        recorder = self.recorder
+        encounter_seen = aggregator.encounter_id
+        connection = self.connection
+        running = True
+        while running:
+            batch = None
+            try:
+                if connection.poll(PUMP_INTERVAL):
+                    batch = self.handle(connection.recv())
+            except (EOFError, OSError):
+                running = False  # the child exited and everything it sent is in
+            except Exception as e:
+                log.exception("Error handling reader message: %s", e)
+            try:
+                # One batch per flush: the flush that opens a new encounter is
+                # the one that applied its first batch, so each batch is recorded
+                # on the right side of the boundary
+                aggregator.flush()
+                if recorder is not None:
+                    if aggregator.encounter_id != encounter_seen:
+                        encounter_seen = aggregator.encounter_id
+                        recorder.start_encounter()
+                    if batch is not None:
+                        recorder.record(batch)
+            except Exception as e:
+                log.warning("Error in reader pump: %s", e)
+        connection.close()
@@ -0,0 +1,190 @@
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+
+from events import CombatEvent
+
+log = logging.getLogger(__name__)
+
+# <name>.dpsev:  32-byte header, then one fixed 32-byte record per hit
+# <name>.dpsstr: append-only string table, (id, length, utf-8 name) per entry
+MAGIC = b"DPSEVT01"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIId8x")  # magic, version, record size, encounter start
+RECORD = struct.Struct("<dIIIq?3x")  # timestamp, actor, target, skill, damage, critical
+STRING_ENTRY = struct.Struct("<IH")
+EVENTS_SUFFIX = ".dpsev"
+STRINGS_SUFFIX = ".dpsstr"
+
+_NEW_ENCOUNTER = object()
+_STOP = object()
+
+
+class EncounterRecorder:
+    # Streams parsed batches to disk from a background thread. record() only
+    # queues the batch, so the worker never waits on the disk.
+    def __init__(self, directory, fsync_interval=5.0):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue()
+        self.events_file = None
+        self.strings_file = None
+        self.written_symbols = set()
+        self.current_name = None
+        self.records_written = 0
+        self.last_fsync = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name="encounter-recorder", daemon=True)
+        self.thread.start()
+
+    def record(self, batch):
+        if len(batch):
+            self.queue.put(batch)
+
+    def start_encounter(self):
+        # Everything recorded after this goes to a new file pair
+        self.queue.put(_NEW_ENCOUNTER)
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+            try:
+                if item is _STOP:
+                    self.close_files()
+                    return
+                if item is _NEW_ENCOUNTER:
+                    self.close_files()
+                elif item is not None:
+                    self.write_batch(item)
+                if self.events_file and time.monotonic() - self.last_fsync >= self.fsync_interval:
+                    self.sync()
+            except Exception as e:
+                log.exception("Encounter recorder failed: %s", e)
+
+    def open_files(self, start_time):
+        stamp = datetime.fromtimestamp(start_time).strftime("%Y%m%d-%H%M%S")
+        name = f"encounter-{stamp}"
+        suffix = 1
+        while os.path.exists(os.path.join(self.directory, name + EVENTS_SUFFIX)):
+            suffix += 1
+            name = f"encounter-{stamp}-{suffix}"
+        base = os.path.join(self.directory, name)
+        self.events_file = open(base + EVENTS_SUFFIX, "ab")
+        self.strings_file = open(base + STRINGS_SUFFIX, "ab")
+        self.events_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size, start_time))
+        self.written_symbols = set()
+        self.current_name = name
+
+    def close_files(self):
+        if self.events_file is None:
+            return
+        self.sync()
+        self.events_file.close()
+        self.strings_file.close()
+        self.events_file = None
+        self.strings_file = None
+
+    def write_batch(self, batch):
+        if self.events_file is None:
+            self.open_files(batch.timestamps[0])
+
+        # Strings first, so a reader never sees a record whose names are missing
+        names = batch.symbols.names
+        written = self.written_symbols
+        strings = bytearray()
+        for column in (batch.actors, batch.targets, batch.skills):
+            for symbol in column:
+                if symbol not in written:
+                    written.add(symbol)
+                    encoded = names[symbol].encode("utf-8")
+                    strings += STRING_ENTRY.pack(symbol, len(encoded)) + encoded
+        if strings:
+            self.strings_file.write(strings)
+            self.strings_file.flush()
+
+        records = bytearray(RECORD.size * len(batch))
+        pack_into = RECORD.pack_into
+        offset = 0
+        for row in zip(batch.timestamps, batch.actors, batch.targets, batch.skills, batch.damages, batch.crits):
+            pack_into(records, offset, *row)
+            offset += RECORD.size
+        self.events_file.write(records)
+        self.events_file.flush()
+        self.records_written += len(batch)
+
+    def sync(self):
+        for handle in (self.strings_file, self.events_file):
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.last_fsync = time.monotonic()
+
+
+class EncounterLog:
+    # Read side of a recording. The event file is memory-mapped and records are
+    # unpacked lazily, so reopening a multi-hour log costs next to nothing.
+    def __init__(self, path):
+        base = path[:-len(EVENTS_SUFFIX)] if path.endswith(EVENTS_SUFFIX) else path
+        self.path = base + EVENTS_SUFFIX
+        self.names = load_string_table(base + STRINGS_SUFFIX)
+        with open(self.path, "rb") as handle:
+            self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.start_time = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+            self.map.close()
+            raise Exception(f"{self.path} is not a supported encounter recording.")
+        # A crash can leave a partial record at the end, ignore it
+        self.count = (len(self.map) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def records(self):
+        # Raw (timestamp, actor, target, skill, damage, critical) tuples. Unpacked
+        # by offset rather than through a memoryview, which would make close()
+        # fail for as long as a half-consumed iterator is alive.
+        data = self.map
+        unpack_from = RECORD.unpack_from
+        for offset in range(HEADER.size, HEADER.size + self.count * RECORD.size, RECORD.size):
+            yield unpack_from(data, offset)
+
+    def __iter__(self):
+        for timestamp, actor, target, skill, damage, critical in self.records():
+            yield CombatEvent(actor, target, skill, damage, critical, timestamp)
+
+    def name(self, symbol):
+        return self.names[symbol]
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_string_table(path):
+    names = {}
+    with open(path, "rb") as handle:
+        data = handle.read()
+    offset = 0
+    while offset + STRING_ENTRY.size <= len(data):
+        symbol, length = STRING_ENTRY.unpack_from(data, offset)
+        offset += STRING_ENTRY.size
+        if offset + length > len(data):
+            break
+        names[symbol] = data[offset:offset + length].decode("utf-8")
+        offset += length
+    return names
@@ -0,0 +1,127 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from aggregator import Aggregator
+from combat_log_parser import CombatLogParser, ParsedBatch
+from events import SymbolTable
+from recorder import EVENTS_SUFFIX, EncounterLog
+
+
+def iter_text_polls(path, parser, lines_per_second=50.0, poll_size=20, start_time=None):
+    # Chops a plain text combat log into poll-sized chunks, stamping them as if
+    # the lines had arrived at `lines_per_second` from `start_time` on. Text
+    # logs carry no times of their own; the file's modification time is the
+    # best default, and keeps stored encounters out of 1970.
+    timestamp = os.path.getmtime(path) if start_time is None else start_time
+    chunk = []
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            chunk.append(line)
+            if len(chunk) >= poll_size:
+                yield timestamp, len(chunk), parser.parse_batch(chunk, timestamp)
+                timestamp += len(chunk) / lines_per_second
+                chunk = []
+    if chunk:
+        yield timestamp, len(chunk), parser.parse_batch(chunk, timestamp)
+
+
+def iter_recorded_polls(path, symbols):
+    # Regroups a recording into its original polls (hits sharing a timestamp),
+    # re-interning the recorded names into `symbols`
+    with EncounterLog(path) as log:
+        remap = {}
+        batch = None
+        for timestamp, actor, target, skill, damage, critical in log.records():
+            if batch is not None and timestamp != batch.timestamps[0]:
+                yield batch.timestamps[0], len(batch), batch
+                batch = None
+            if batch is None:
+                batch = ParsedBatch(symbols)
+            ids = []
+            for symbol in (actor, target, skill):
+                mapped = remap.get(symbol)
+                if mapped is None:
+                    mapped = remap[symbol] = symbols.intern(log.name(symbol))
+                ids.append(mapped)
+            batch.append(ids[0], ids[1], ids[2], damage, critical, timestamp)
+        if batch is not None:
+            yield batch.timestamps[0], len(batch), batch
+
+
+def run_replay(polls, aggregator, realtime=False, speed=1.0):
+    # Feeds polls through the aggregator exactly like the worker does. With
+    # realtime=True the original pacing is kept (scaled by `speed`).
+    lines = hits = 0
+    first_timestamp = last_timestamp = None
+    started = time.perf_counter()
+    for timestamp, line_count, batch in polls:
+        if first_timestamp is None:
+            first_timestamp = timestamp
+        if realtime:
+            delay = (timestamp - first_timestamp) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        aggregator.submit(batch)
+        aggregator.flush(now=timestamp)
+        lines += line_count
+        hits += len(batch)
+        last_timestamp = timestamp
+    # Whatever is still open at the end of the log counts as finished
+    aggregator.close_encounter()
+    elapsed = time.perf_counter() - started
+    span = (last_timestamp - first_timestamp) if first_timestamp is not None else 0.0
+    return {"lines": lines, "hits": hits, "elapsed": elapsed, "span": span}
+
+
+def print_report(result, aggregator, out=sys.stdout):
+    elapsed = result["elapsed"]
+    rate = result["lines"] / elapsed if elapsed > 0 else 0.0
+    out.write(f"Replayed {result['lines']:,} lines ({result['hits']:,} hits) in {elapsed:.3f}s "
+              f"-> {rate:,.0f} lines/sec\n")
+    for encounter in aggregator.get_encounters():
+        out.write(f"\nEncounter #{encounter.id}: {encounter.duration:.0f}s, {encounter.total_damage:,} damage\n")
+        out.write(f"{'Actor':<24}{'Class':<16}{'Damage':>14}{'DPS':>12}{'Hits':>8}{'Crit%':>8}{'Highest':>10}\n")
+        for actor, data in sorted(encounter.stats.items(), key=lambda item: item[1]["total_damage"], reverse=True):
+            events = data["events"]
+            crit = data["crit_events"] / events * 100 if events else 0
+            out.write(f"{actor:<24}{data['class'] or '-':<16}{data['total_damage']:>14,}{int(data['dps']):>12,}"
+                      f"{events:>8,}{crit:>7.1f}%{data['highest_hit']:>10,}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a combat log or encounter recording through the "
+                                                 "parser and aggregator.")
+    parser.add_argument("path", help="plain text combat log, or a recorded .dpsev encounter")
+    parser.add_argument("--realtime", action="store_true", help="keep the original pacing instead of "
+                                                                "replaying as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing multiplier for --realtime")
+    parser.add_argument("--rate", type=float, default=50.0, help="lines/sec assumed for text logs")
+    parser.add_argument("--poll-size", type=int, default=20, help="lines per simulated poll for text logs")
+    parser.add_argument("--start", type=datetime.fromisoformat, metavar="DATETIME",
+                        help="when a text log starts, e.g. 2026-10-18T20:15 (default: the file's modification time)")
+    parser.add_argument("--store", nargs="?", const="", metavar="DB",
+                        help="also save the encounters to the history database (default location if no path)")
+    args = parser.parse_args(argv)
+
+    symbols = SymbolTable()
+    aggregator = Aggregator(symbols, history_size=None)  # report every encounter in the log
+    if args.path.endswith(EVENTS_SUFFIX):
+        polls = iter_recorded_polls(args.path, symbols)
+    else:
+        start_time = args.start.timestamp() if args.start is not None else None
+        polls = iter_text_polls(args.path, CombatLogParser(symbols), args.rate, args.poll_size, start_time)
+    result = run_replay(polls, aggregator, realtime=args.realtime, speed=args.speed)
+    print_report(result, aggregator)
+    if args.store is not None:
+        from history_store import HistoryStore
+        store = HistoryStore(args.store or None)
+        store.import_summaries(aggregator.get_encounters())
+        store.close()
+        print(f"Stored {len(aggregator.get_encounters())} encounters in {store.path}")
+
+
+if __name__ == "__main__":
+    main()
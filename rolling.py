@@ -0,0 +1,155 @@
+from array import array
+
+
+class RollingDamage:
+    # Damage of one actor in fixed-size time buckets. A ring covering the longest
+    # window keeps a running sum per window, so rolling DPS is a division and
+    # moving forward in time costs O(windows) per elapsed bucket. Older history is
+    # kept as a DPS-over-time series that halves its resolution whenever it fills
+    # up, so memory stays bounded however long the session runs.
+    #
+    # Damage for the newest bucket is only summed into open_damage; it reaches
+    # the ring, the window sums and the series once that bucket is over, so a
+    # burst of hits costs one addition each. The DPS readers add it back in.
+    def __init__(self, start_time, bucket_size=0.1, windows=(5, 10, 30), burst_window=5,
+                 series_resolution=1.0, series_length=512):
+        self.bucket_size = bucket_size
+        self.windows = tuple(windows)
+        self.window_buckets = tuple(max(1, int(round(w / bucket_size))) for w in self.windows)
+        self.ring = array("q", bytes(8 * max(self.window_buckets)))
+        self.sums = [0] * len(self.windows)
+        self.dps_keys = tuple(f"dps_{window}s" for window in self.windows)
+        self.head = int(start_time / bucket_size)  # absolute index of the newest bucket
+
+        self.burst_index = self.windows.index(burst_window) if burst_window in self.windows else 0
+        self.peak_sum = 0
+
+        self.series_start = start_time
+        self.series_resolution = series_resolution
+        self.series_length = series_length
+        self.series = array("q")
+
+        self.open_bucket = self.head
+        self.open_damage = 0
+        self.open_time = start_time
+
+    def add(self, timestamp, damage):
+        bucket = int(timestamp / self.bucket_size)
+        if bucket == self.open_bucket:
+            self.open_damage += damage
+            self.open_time = timestamp
+        elif bucket > self.open_bucket:
+            self.commit()
+            self.advance_bucket(bucket)
+            self.open_bucket = bucket
+            self.open_damage = damage
+            self.open_time = timestamp
+        else:
+            self.add_to_ring(bucket, timestamp, damage)  # late hit for a closed bucket
+
+    def commit(self):
+        if self.open_damage:
+            self.add_to_ring(self.open_bucket, self.open_time, self.open_damage)
+            self.open_damage = 0
+
+    def add_to_ring(self, bucket, timestamp, damage):
+        if bucket > self.head:
+            self.advance_to(bucket)
+        age = self.head - bucket
+        ring = self.ring
+        if age < len(ring):
+            ring[bucket % len(ring)] += damage
+            sums = self.sums
+            for i, size in enumerate(self.window_buckets):
+                if age < size:
+                    sums[i] += damage
+            burst = sums[self.burst_index]
+            if burst > self.peak_sum:
+                self.peak_sum = burst
+        self.add_to_series(timestamp, damage)
+
+    def advance_to(self, bucket):
+        # Slides every window forward to end at `bucket`
+        ring = self.ring
+        length = len(ring)
+        if bucket - self.head >= length:
+            # Idle for longer than the longest window, nothing survives
+            for i in range(length):
+                ring[i] = 0
+            self.sums = [0] * len(self.sums)
+            self.head = bucket
+            return
+        sums = self.sums
+        sizes = self.window_buckets
+        for current in range(self.head + 1, bucket + 1):
+            for i, size in enumerate(sizes):
+                sums[i] -= ring[(current - size) % length]
+            ring[current % length] = 0
+        self.head = bucket
+
+    def advance(self, now):
+        return self.advance_bucket(int(now / self.bucket_size))
+
+    def advance_bucket(self, bucket):
+        # Returns True when any window still held damage, i.e. the DPS figures moved
+        if bucket <= self.head:
+            return False
+        if bucket > self.open_bucket and self.open_damage:
+            self.commit()
+        if not any(self.sums):
+            # Every window is empty, so is the ring: only the head moves
+            self.head = bucket
+            return False
+        self.advance_to(bucket)
+        return True
+
+    def add_to_series(self, timestamp, damage):
+        index = int((timestamp - self.series_start) / self.series_resolution)
+        if index < 0:
+            index = 0
+        while index >= self.series_length:
+            self.compact_series()
+            index = int((timestamp - self.series_start) / self.series_resolution)
+        series = self.series
+        if index >= len(series):
+            series.extend(array("q", [0]) * (index + 1 - len(series)))
+        series[index] += damage
+
+    def compact_series(self):
+        # Merge neighbouring points, doubling the time each point covers
+        old = self.series
+        merged = array("q", [0]) * ((len(old) + 1) // 2)
+        for i, value in enumerate(old):
+            merged[i // 2] += value
+        self.series = merged
+        self.series_resolution *= 2
+
+    def dps(self, window_index):
+        return (self.sums[window_index] + self.open_damage) / self.windows[window_index]
+
+    def rolling_dps(self):
+        open_damage = self.open_damage
+        return {window: (self.sums[i] + open_damage) / window for i, window in enumerate(self.windows)}
+
+    def fill_stats(self, stats):
+        # Adds "peak_dps" and the "dps_<window>s" figures to a snapshot dict
+        open_damage = self.open_damage
+        sums = self.sums
+        burst = sums[self.burst_index] + open_damage
+        stats["peak_dps"] = (burst if burst > self.peak_sum else self.peak_sum) / self.windows[self.burst_index]
+        for key, total, window in zip(self.dps_keys, sums, self.windows):
+            stats[key] = (total + open_damage) / window
+
+    def peak_dps(self):
+        peak = max(self.peak_sum, self.sums[self.burst_index] + self.open_damage)
+        return peak / self.windows[self.burst_index]
+
+    def dps_series(self):
+        # [(seconds since the actor's first hit, dps over that point), ...]
+        resolution = self.series_resolution
+        series = list(self.series)
+        if self.open_damage:
+            index = max(0, int((self.open_time - self.series_start) / resolution))
+            series.extend([0] * (index + 1 - len(series)))
+            series[index] += self.open_damage
+        return [(i * resolution, value / resolution) for i, value in enumerate(series)]
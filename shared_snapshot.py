@@ -0,0 +1,315 @@
+import argparse
+import ctypes
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+log = logging.getLogger(__name__)
+
+DEFAULT_NAME = "dreaddps-stats"
+MAGIC = b"DPSSNAP1"
+LAYOUT_VERSION = 1
+ROLLING_SLOTS = 3
+
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+STILL_ACTIVE = 259
+ERROR_ACCESS_DENIED = 5
+
+# Segment layout, little-endian, HEADER_SIZE + max_actors * RECORD.size bytes:
+#
+#   offset  size  header (HEADER_SIZE = 128 bytes)
+#        0     8  magic b"DPSSNAP1"
+#        8     4  layout version (uint32)
+#       12     4  record size, 136 (uint32)
+#       16     4  max actors (uint32)
+#       20     4  actor count (uint32)
+#       24     8  seqlock counter (uint64), odd while a write is in progress
+#       32     8  snapshot version (uint64)
+#       40     8  encounter id (uint64)
+#       48     8  global start time (double, time.time(), NaN when unset)
+#       56     8  newest hit (double, NaN when unset)
+#       64     8  publish time (double)
+#       72     6  rolling window lengths in seconds (3 x uint16, 0 = unused)
+#       78     2  reserved, zero
+#       80     4  writer process id (uint32), 0 in segments from older meters
+#       84    44  reserved, zero
+#
+#   offset  size  actor record (RECORD.size = 136 bytes), at 128 + index * 136
+#        0    48  name (UTF-8, NUL padded)
+#       48    16  class (UTF-8, NUL padded, empty when unknown)
+#       64     8  total damage (int64)
+#       72     8  events (int64)
+#       80     8  crits (int64)
+#       88     8  highest hit (int64)
+#       96     8  start time (double, NaN when unset)
+#      104     8  peak DPS (double)
+#      112    24  DPS per rolling window, in header order (3 x double)
+HEADER = struct.Struct("<8sIIII")
+SEQ_OFFSET = 24
+BODY = struct.Struct(f"<QQddd{ROLLING_SLOTS}H")
+BODY_OFFSET = 32
+WRITER = struct.Struct("<I")
+WRITER_OFFSET = 80
+HEADER_SIZE = 128
+RECORD = struct.Struct(f"<48s16sqqqqdd{ROLLING_SLOTS}d")
+
+
+def encode_name(name, size):
+    data = (name or "").encode("utf-8")[:size]
+    # Don't leave half a multi-byte character at the cut
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+
+def segment_size(max_actors):
+    return HEADER_SIZE + max_actors * RECORD.size
+
+
+def process_alive(pid):
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return ctypes.GetLastError() == ERROR_ACCESS_DENIED  # exists, but isn't ours to open
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sequence_view(buffer):
+    # The counter is only ever accessed as one aligned 8-byte word. struct's
+    # pack_into zeroes its target before filling it in, and a transient 0 would
+    # look like a consistent (even) sequence to a reader.
+    return buffer[SEQ_OFFSET:SEQ_OFFSET + 8].cast("Q")
+
+
+class SharedSnapshotWriter:
+    # Mirrors each published StatsSnapshot into a named shared memory segment
+    # with a fixed layout, so overlays and bots in other processes can poll the
+    # numbers without talking to us. Register on_snapshot as an aggregator
+    # listener. Readers synchronize through the seqlock counter in the header:
+    # it is odd while a write is in progress and bumped again when it's done.
+    # Only records of actors whose stats dict changed are re-packed.
+    def __init__(self, name=DEFAULT_NAME, max_actors=64, rolling_windows=(5, 10, 30)):
+        self.name = name
+        self.max_actors = max_actors
+        self.windows = tuple(rolling_windows)[:ROLLING_SLOTS]
+        self.window_keys = [f"dps_{window}s" for window in self.windows]
+        try:
+            self.segment = shared_memory.SharedMemory(name=name, create=True, size=segment_size(max_actors))
+        except FileExistsError:
+            self.remove_stale_segment(name)
+            self.segment = shared_memory.SharedMemory(name=name, create=True, size=segment_size(max_actors))
+        self.buffer = self.segment.buf
+        WRITER.pack_into(self.buffer, WRITER_OFFSET, os.getpid())
+        self.seq = 0
+        self.sequence = sequence_view(self.buffer)
+        self.lock = threading.Lock()  # reset() may notify from the UI thread
+        self.slots = {}  # actor name -> record index
+        self.written = []  # stats dict last packed into each record
+        self.encounter = None
+        self.overflow_logged = False
+        self.write_header(0, 0, None, None, None)
+
+    @staticmethod
+    def remove_stale_segment(name):
+        # Only a segment whose writer is gone may be replaced. One that is
+        # still being written belongs to another meter, and unlinking it would
+        # cut that meter off from every program reading it.
+        stale = shared_memory.SharedMemory(name=name)
+        try:
+            writer = 0
+            if stale.size >= HEADER_SIZE and bytes(stale.buf[:len(MAGIC)]) == MAGIC:
+                writer = WRITER.unpack_from(stale.buf, WRITER_OFFSET)[0]
+        finally:
+            stale.close()
+        if writer and process_alive(writer):
+            raise Exception(f"Shared memory segment {name!r} is in use by another running meter (pid {writer}); "
+                            f"pick another name with --shared-snapshot NAME")
+        log.info("Replacing shared memory segment %r left over from a meter that exited", name)
+        stale.unlink()
+
+    def write_header(self, version, encounter, global_start, newest_hit, count):
+        windows = self.windows + (0,) * (ROLLING_SLOTS - len(self.windows))
+        HEADER.pack_into(self.buffer, 0, MAGIC, LAYOUT_VERSION, RECORD.size, self.max_actors, count or 0)
+        BODY.pack_into(self.buffer, BODY_OFFSET, version, encounter,
+                       global_start if global_start is not None else math.nan,
+                       newest_hit if newest_hit is not None else math.nan, time.time(), *windows)
+
+    def on_snapshot(self, snapshot):
+        try:
+            with self.lock:
+                if self.buffer is not None:  # not closed yet
+                    self.publish(snapshot)
+        except Exception as e:
+            log.exception("Failed to publish shared snapshot: %s", e)
+
+    def publish(self, snapshot):
+        stats = snapshot.stats
+        buffer = self.buffer
+        slots = self.slots
+        names = list(stats)
+        if len(names) > self.max_actors:
+            if not self.overflow_logged:
+                log.warning("Shared snapshot holds %d actors, dropping the lowest damage ones", self.max_actors)
+                self.overflow_logged = True
+            names = sorted(names, key=lambda actor: stats[actor]["total_damage"], reverse=True)[:self.max_actors]
+        kept = set(names)
+        # A new encounter, a reset or overflow drops actors; lay the records out again
+        if snapshot.encounter != self.encounter or any(name not in kept for name in slots):
+            slots.clear()
+            self.written = []
+            self.encounter = snapshot.encounter
+
+        self.seq += 1  # odd: write in progress
+        self.sequence[0] = self.seq
+        written = self.written
+        window_keys = self.window_keys
+        padding = (0.0,) * (ROLLING_SLOTS - len(window_keys))
+        for name in names:
+            index = slots.get(name)
+            data = stats[name]
+            if index is None:
+                index = slots[name] = len(slots)
+                written.append(None)
+            elif written[index] is data:
+                continue  # unchanged since the last snapshot
+            start_time = data["start_time"]
+            RECORD.pack_into(buffer, HEADER_SIZE + index * RECORD.size,
+                             encode_name(name, 48), encode_name(data["class"], 16), data["total_damage"],
+                             data["events"], data["crit_events"], data["highest_hit"],
+                             start_time.timestamp() if start_time is not None else math.nan, data["peak_dps"],
+                             *(data.get(key, 0.0) for key in window_keys), *padding)
+            written[index] = data
+        global_start = snapshot.global_start_time.timestamp() if snapshot.global_start_time is not None else None
+        self.write_header(snapshot.version, snapshot.encounter, global_start, snapshot.newest_hit, len(slots))
+        self.seq += 1  # even again, stored last: everything above is consistent
+        self.sequence[0] = self.seq
+
+    def close(self):
+        with self.lock:
+            self.sequence.release()
+            self.buffer = None
+            self.segment.close()
+            try:
+                self.segment.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedSnapshotReader:
+    # Lock-free reader for another process. read() copies the segment and
+    # retries if the writer was in the middle of an update; it never blocks the
+    # writer. changed() is a cheap check for whether anything was published.
+    def __init__(self, name=DEFAULT_NAME, retries=100):
+        self.segment = shared_memory.SharedMemory(name=name)
+        if sys.platform != "win32":
+            # Attaching registers the segment with this process's resource
+            # tracker, which would unlink it from under the meter at exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.segment._name, "shared_memory")
+        self.buffer = self.segment.buf
+        self.sequence_word = sequence_view(self.buffer)
+        self.retries = retries
+        self.last_seq = None
+        fields = HEADER.unpack_from(self.buffer, 0)
+        if fields[0] != MAGIC or fields[1] != LAYOUT_VERSION:
+            self.close()
+            raise Exception(f"Shared memory segment {name!r} is not a DreadDPS snapshot (layout {fields[1]})")
+
+    def sequence(self):
+        return self.sequence_word[0]
+
+    def changed(self):
+        return self.sequence() != self.last_seq
+
+    def read(self):
+        # Returns None if every attempt raced with a write
+        buffer = self.buffer
+        for _ in range(self.retries):
+            before = self.sequence()
+            if before & 1:
+                time.sleep(0)
+                continue
+            header = HEADER.unpack_from(buffer, 0) + BODY.unpack_from(buffer, BODY_OFFSET)
+            count = min(header[4], header[3])
+            records = bytes(buffer[HEADER_SIZE:HEADER_SIZE + count * header[2]])
+            if self.sequence() != before:
+                continue
+            self.last_seq = before
+            return self.decode(header, records, count)
+        return None
+
+    def decode(self, header, records, count):
+        (_, _, record_size, _, _, version, encounter, global_start, newest_hit, written_at, *windows) = header
+        windows = [window for window in windows if window]
+        actors = {}
+        for index in range(count):
+            fields = RECORD.unpack_from(records, index * record_size)
+            name = fields[0].rstrip(b"\x00").decode("utf-8")
+            actors[name] = {
+                "class": fields[1].rstrip(b"\x00").decode("utf-8") or None,
+                "total_damage": fields[2],
+                "events": fields[3],
+                "crit_events": fields[4],
+                "highest_hit": fields[5],
+                "start_time": None if math.isnan(fields[6]) else fields[6],
+                "peak_dps": fields[7],
+                **{f"dps_{window}s": fields[8 + slot] for slot, window in enumerate(windows)},
+            }
+        return {
+            "version": version,
+            "encounter": encounter,
+            "global_start_time": None if math.isnan(global_start) else global_start,
+            "newest_hit": None if math.isnan(newest_hit) else newest_hit,
+            "written_at": written_at,
+            "actors": actors,
+        }
+
+    def close(self):
+        self.sequence_word.release()
+        self.buffer = None
+        self.segment.close()
+
+
+def main(argv=None):
+    # Example consumer: prints the meter's numbers whenever they change
+    parser = argparse.ArgumentParser(description="Print the live stats a running meter shares in memory.")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="shared memory segment name")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls")
+    args = parser.parse_args(argv)
+
+    reader = SharedSnapshotReader(args.name)
+    try:
+        while True:
+            if reader.changed():
+                snapshot = reader.read()
+                if snapshot is not None:
+                    print(f"snapshot {snapshot['version']} encounter {snapshot['encounter']}")
+                    actors = sorted(snapshot["actors"].items(), key=lambda item: item[1]["total_damage"],
+                                    reverse=True)
+                    for name, data in actors:
+                        print(f"  {name:<24}{data['class'] or '':<12}{data['total_damage']:>14,}"
+                              f"{data['peak_dps']:>12,.0f} peak")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import struct
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_CLIENT_BUFFER = 1024 * 1024  # bytes queued for a client before it's dropped as too slow
+MAX_CLIENT_FRAME = 4096  # clients only send pings and closes; anything bigger gets them disconnected
+FIELDS = ("class", "total_damage", "events", "crit_events", "highest_hit", "peak_dps")
+
+OVERLAY_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>DreadDPS</title>
+<style>body{font:14px sans-serif;background:transparent;color:#fff;text-shadow:0 0 3px #000}
+td{padding:1px 8px}td.n{text-align:right}</style></head>
+<body><table id="rows"></table><script>
+// Names come from other players' chat lines: only ever set as text, never as markup
+let actors = new Map();
+function cell(text, numeric) {
+  const td = document.createElement("td");
+  if (numeric) td.className = "n";
+  td.textContent = text;
+  return td;
+}
+function render() {
+  const rows = [...actors].sort((a, b) => b[1].total_damage - a[1].total_damage);
+  document.getElementById("rows").replaceChildren(...rows.map(([name, d]) => {
+    const row = document.createElement("tr");
+    row.append(cell(name), cell(d.class || ""), cell(d.total_damage.toLocaleString(), true),
+               cell(`${Math.round(d.dps || 0).toLocaleString()}/s`, true));
+    return row;
+  }));
+}
+function connect() {
+  const socket = new WebSocket(`ws://${location.host}/ws`);
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === "full") actors = new Map(Object.entries(message.actors));
+    for (const [name, fields] of Object.entries(message.changed || {})) {
+      actors.set(name, {...actors.get(name), ...fields});
+    }
+    render();
+  };
+  socket.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script></body></html>
+"""
+
+
+def actor_fields(data, duration, windows):
+    # JSON-friendly subset of one actor's snapshot dict
+    fields = {name: data[name] for name in FIELDS}
+    fields["dps"] = round(data["total_damage"] / duration, 1)
+    fields["peak_dps"] = round(fields["peak_dps"], 1)
+    for key in windows:
+        fields[key] = round(data.get(key, 0.0), 1)
+    return fields
+
+
+def websocket_frame(payload, opcode=0x1):
+    # Server frames are never masked
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class StatsServer:
+    # Local HTTP + WebSocket server for overlays and a second screen, on its own
+    # asyncio loop in a background thread.
+    #   GET /       a minimal overlay page
+    #   GET /stats  the current snapshot as JSON
+    #   GET /ws     WebSocket: one "full" message, then a "delta" per tick with
+    #               only the actors and fields that changed
+    # The aggregator listener only flags that a snapshot is waiting, so the
+    # worker thread never waits on the network. Each message is serialized and
+    # framed once per tick and the same bytes go to every client.
+    def __init__(self, aggregator, host="127.0.0.1", port=8765, tick=0.1):
+        self.aggregator = aggregator
+        self.host = host
+        self.port = port
+        self.tick = tick
+        self.windows = [f"dps_{window}s" for window in aggregator.rolling_windows]
+        self.loop = None
+        self.server = None
+        self.snapshot_ready = None
+        self.pending = False
+        self.clients = set()
+        self.thread = threading.Thread(target=self.run, name="stats-server", daemon=True)
+        self.started = threading.Event()
+        self.error = None
+
+        # Owned by the loop: what clients have been sent so far
+        self.sent_version = None
+        self.sent_encounter = None
+        self.sent_fields = {}  # actor -> fields as clients have them
+        self.full_frame = None
+        self.full_body = None
+
+    def start(self):
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+        self.aggregator.add_listener(self.on_snapshot)
+
+    def stop(self):
+        self.aggregator.remove_listener(self.on_snapshot)
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2)
+
+    def on_snapshot(self, snapshot):
+        # Writer thread: one flag check, and at most one wakeup per tick
+        if not self.pending:
+            self.pending = True
+            self.loop.call_soon_threadsafe(self.snapshot_ready.set)
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.snapshot_ready = asyncio.Event()
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle_connection, self.host, self.port)
+            )
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            self.loop.close()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info("Stats server listening on http://%s:%d/", self.host, self.port)
+        self.started.set()
+        broadcaster = self.loop.create_task(self.broadcast())
+        try:
+            self.loop.run_forever()
+        finally:
+            broadcaster.cancel()
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            self.loop.run_until_complete(asyncio.gather(broadcaster, self.server.wait_closed(),
+                                                        return_exceptions=True))
+            self.loop.close()
+
+    async def broadcast(self):
+        while True:
+            await self.snapshot_ready.wait()
+            self.snapshot_ready.clear()
+            self.pending = False
+            try:
+                self.catch_up()
+            except Exception as e:
+                log.exception("Stats server broadcast failed: %s", e)
+            # Coalesce whatever the worker publishes within one tick
+            await asyncio.sleep(self.tick)
+
+    def catch_up(self):
+        # The shared state only moves forward together with the connected
+        # clients: whoever advances it (a tick, /stats, a new client) sends the
+        # delta to everyone first
+        frame = self.build_delta(self.aggregator.snapshot)
+        if frame is not None:
+            self.send_all(frame)
+
+    def build_delta(self, snapshot):
+        if snapshot.version == self.sent_version:
+            return None
+        duration = 1.0
+        if snapshot.global_start_time is not None and snapshot.newest_hit is not None:
+            duration = max(1.0, snapshot.newest_hit - snapshot.global_start_time.timestamp())
+        stats = snapshot.stats
+        full = snapshot.encounter != self.sent_encounter or any(name not in stats for name in self.sent_fields)
+        if full:
+            self.sent_fields = {}
+        # Every actor is re-checked: an idle actor's DPS still drops as the fight goes on
+        changed = {}
+        for name, data in stats.items():
+            fields = actor_fields(data, duration, self.windows)
+            previous = self.sent_fields.get(name)
+            if previous is None:
+                changed[name] = fields
+            else:
+                diff = {key: value for key, value in fields.items() if previous[key] != value}
+                if diff:
+                    changed[name] = diff
+            self.sent_fields[name] = fields
+        self.sent_version = snapshot.version
+        self.sent_encounter = snapshot.encounter
+        self.full_frame = self.full_body = None  # rebuilt lazily for new clients
+        if full:
+            return self.full_message()[0]
+        if not changed:
+            return None
+        return websocket_frame(json.dumps({
+            "type": "delta",
+            "version": snapshot.version,
+            "encounter": snapshot.encounter,
+            "changed": changed,
+        }, separators=(",", ":")).encode("utf-8"))
+
+    def full_message(self):
+        # (WebSocket frame, JSON body) of the state clients have; cached until it changes
+        if self.full_frame is None:
+            self.full_body = json.dumps({
+                "type": "full",
+                "version": self.sent_version,
+                "encounter": self.sent_encounter,
+                "actors": self.sent_fields,
+            }, separators=(",", ":")).encode("utf-8")
+            self.full_frame = websocket_frame(self.full_body)
+        return self.full_frame, self.full_body
+
+    def send_all(self, frame):
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                log.warning("Dropping stats client %s, it isn't keeping up", writer.get_extra_info("peername"))
+                self.clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) >= 2 else ""
+            if parts[:1] != ["GET"]:
+                await self.respond(writer, "405 Method Not Allowed", b"", "text/plain")
+            elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self.serve_websocket(reader, writer, headers)
+            elif path == "/stats":
+                self.catch_up()
+                await self.respond(writer, "200 OK", self.full_message()[1], "application/json")
+            elif path == "/":
+                await self.respond(writer, "200 OK", OVERLAY_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+            else:
+                await self.respond(writer, "404 Not Found", b"", "text/plain")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            log.warning("Stats server request failed: %s", e)
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def respond(self, writer, status, body, content_type):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Cache-Control: no-store\r\nAccess-Control-Allow-Origin: *\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self.respond(writer, "400 Bad Request", b"", "text/plain")
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        # Bring the shared state (and everyone else) up to date, then start this client from it
+        self.catch_up()
+        writer.write(self.full_message()[0])
+        self.clients.add(writer)
+        await writer.drain()
+        # Clients don't send us anything useful; just answer pings and closes
+        while True:
+            first, second = await reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await reader.readexactly(8))[0]
+            if length > MAX_CLIENT_FRAME:
+                log.warning("Closing stats client %s: %d byte frame", writer.get_extra_info("peername"), length)
+                writer.write(websocket_frame(struct.pack("!H", 1009), 0x8))  # 1009: message too big
+                await writer.drain()
+                return
+            mask = await reader.readexactly(4) if second & 0x80 else b"\x00\x00\x00\x00"
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(await reader.readexactly(length)))
+            if opcode == 0x8:
+                writer.write(websocket_frame(payload[:2], 0x8))
+                await writer.drain()
+                return
+            if opcode == 0x9:
+                writer.write(websocket_frame(payload, 0xA))
+
+
+def run_demo(aggregator, stop_event, lines_per_second):
+    # Synthetic feed: the real reader and worker against a simulated game
+    from combat_log_parser import CombatLogParser
+    from fake_process import SimulatedGameProcess
+    from memory_reader import MemoryReader
+    from poll_scheduler import AdaptivePollScheduler
+    from worker import combat_log_worker
+
+    game = SimulatedGameProcess(lines_per_second=lines_per_second)
+    reader = MemoryReader(source=game)
+    game.start()
+    try:
+        combat_log_worker(reader, CombatLogParser(aggregator.symbols), aggregator, stop_event,
+                          AdaptivePollScheduler(min_interval=0.05, max_interval=1.0))
+    finally:
+        game.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve live meter stats over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (0.0.0.0 for the LAN)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick", type=float, default=0.1, help="seconds between WebSocket updates")
+    parser.add_argument("--demo", action="store_true", help="serve a synthetic fight instead of the game")
+    parser.add_argument("--rate", type=float, default=50.0, help="lines/sec of the --demo fight")
+    args = parser.parse_args(argv)
+    if not args.demo:
+        parser.error("run main.py --serve to serve the live meter; use --demo here")
+
+    from log_config import configure_logging
+    configure_logging("INFO")
+    from aggregator import Aggregator
+    from events import SymbolTable
+
+    aggregator = Aggregator(SymbolTable())
+    server = StatsServer(aggregator, args.host, args.port, args.tick)
+    server.start()
+    stop_event = threading.Event()
+    feed = threading.Thread(target=run_demo, args=(aggregator, stop_event, args.rate), daemon=True)
+    feed.start()
+    try:
+        while feed.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        feed.join(timeout=2)
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import base64
+import json
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import time
+import unittest
+
+from aggregator import Aggregator
+from events import SymbolTable
+from stats_server import MAX_CLIENT_FRAME, StatsServer
+
+HOSTILE_NAME = "<img src=x onerror=alert(1)>"
+
+# Minimal DOM for running the overlay script under node: elements only keep
+# their children and text, and assigning any HTML property fails the test
+FAKE_DOM = """
+class Element {
+  constructor(tag) { this.tag = tag; this.children = []; this.textContent = ""; }
+  append(...nodes) { this.children.push(...nodes); }
+  replaceChildren(...nodes) { this.children = nodes; }
+  set innerHTML(value) { throw new Error("innerHTML set"); }
+  set outerHTML(value) { throw new Error("outerHTML set"); }
+  insertAdjacentHTML() { throw new Error("insertAdjacentHTML called"); }
+}
+const table = new Element("table");
+globalThis.document = {
+  createElement: (tag) => new Element(tag),
+  getElementById: () => table,
+  write: () => { throw new Error("document.write called"); },
+};
+globalThis.location = {host: "localhost"};
+let socket = null;
+globalThis.WebSocket = class { constructor() { socket = this; } };
+globalThis.setTimeout = () => {};
+"""
+
+FEED_MESSAGES = """
+for (const data of JSON.parse(process.argv[1])) socket.onmessage({data});
+console.log(JSON.stringify(table.children.map((row) => ({
+  tag: row.tag,
+  cells: row.children.map((cell) => ({tag: cell.tag, text: cell.textContent, children: cell.children.length})),
+}))));
+"""
+
+
+def http_get(port, path):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        data = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return data.split(b"\r\n\r\n", 1)[1]
+
+
+class WebSocketClient:
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        self.sock.sendall(f"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode("latin-1"))
+        self.file = self.sock.makefile("rb")
+        while self.file.readline() not in (b"\r\n", b""):
+            pass
+        self.actors = {}
+
+    def read_frame(self):
+        first, second = self.file.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.file.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.file.read(8))[0]
+        return first & 0x0F, self.file.read(length)
+
+    def apply_next(self):
+        _, payload = self.read_frame()
+        message = json.loads(payload)
+        if message["type"] == "full":
+            self.actors = message["actors"]
+        for name, fields in message.get("changed", {}).items():
+            self.actors.setdefault(name, {}).update(fields)
+        return message
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class StatsServerTest(unittest.TestCase):
+    def setUp(self):
+        self.aggregator = Aggregator(SymbolTable())
+        # Long tick, so requests land between two broadcasts
+        self.server = StatsServer(self.aggregator, port=0, tick=0.5)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_stats_request_between_ticks_keeps_clients_in_sync(self):
+        client = WebSocketClient(self.server.port)
+        try:
+            client.apply_next()  # the initial full message
+            self.aggregator.update("Mira", 100, False)
+            self.aggregator.flush()
+            client.apply_next()  # broadcast right away, then the tick sleeps
+
+            self.aggregator.set_actor_class("Mira", "Warrior")
+            self.aggregator.update("Mira", 5000, True)
+            self.aggregator.flush()
+            expected = json.loads(http_get(self.server.port, "/stats"))["actors"]
+
+            deadline = time.time() + 3
+            while client.actors != expected and time.time() < deadline:
+                client.apply_next()
+            self.assertEqual(client.actors, expected)
+            self.assertEqual(client.actors["Mira"]["class"], "Warrior")
+            self.assertEqual(client.actors["Mira"]["highest_hit"], 5000)
+        finally:
+            client.close()
+
+    def test_oversized_client_frame_closes_the_connection(self):
+        client = WebSocketClient(self.server.port)
+        try:
+            client.apply_next()
+            length = MAX_CLIENT_FRAME + 1
+            client.sock.sendall(bytes([0x81, 0xFE]) + struct.pack("!H", length) + b"mask")
+            opcode, payload = client.read_frame()
+            self.assertEqual(opcode, 0x8)
+            self.assertEqual(struct.unpack("!H", payload)[0], 1009)
+            self.assertEqual(client.file.read(1), b"")
+        finally:
+            client.close()
+
+    def test_overlay_renders_actor_names_as_text(self):
+        page = http_get(self.server.port, "/").decode("utf-8")
+        script = page.split("<script>", 1)[1].split("</script>", 1)[0]
+        for sink in ("innerHTML", "outerHTML", "insertAdjacentHTML", "document.write"):
+            self.assertNotIn(sink, script)
+
+        client = WebSocketClient(self.server.port)
+        try:
+            payloads = [client.read_frame()[1].decode("utf-8")]
+            # Open the encounter first, so the hostile name arrives in a delta
+            self.aggregator.update("Mira", 100, False)
+            self.aggregator.flush()
+            payloads.append(client.read_frame()[1].decode("utf-8"))
+            self.aggregator.update(HOSTILE_NAME, 100, False)
+            self.aggregator.set_actor_class(HOSTILE_NAME, "<b>Warrior</b>")
+            self.aggregator.flush()
+            deadline = time.time() + 3
+            while time.time() < deadline:
+                payloads.append(client.read_frame()[1].decode("utf-8"))
+                message = json.loads(payloads[-1])
+                if message.get("changed", {}).get(HOSTILE_NAME, {}).get("class"):
+                    break
+            self.assertEqual(message["type"], "delta")
+        finally:
+            client.close()
+
+        if shutil.which("node") is None:
+            self.skipTest("node is not installed, the overlay script was only checked statically")
+        result = subprocess.run(["node", "-e", FAKE_DOM + script + FEED_MESSAGES, json.dumps(payloads)],
+                                capture_output=True, text=True, timeout=30)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        rows = json.loads(result.stdout)
+        self.assertEqual(len(rows), 2)
+        cells = next(row["cells"] for row in rows if row["cells"][0]["text"] != "Mira")
+        self.assertEqual([cell["tag"] for cell in cells], ["td"] * 4)
+        self.assertEqual(cells[0]["text"], HOSTILE_NAME)
+        self.assertEqual(cells[1]["text"], "<b>Warrior</b>")
+        self.assertTrue(all(cell["children"] == 0 for cell in cells))
+
+
+if __name__ == "__main__":
+    unittest.main()
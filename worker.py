@@ -1,32 +1,49 @@
+import logging
 import time
-from skill_map import SKILL_TO_CLASS  # <-- CHANGED: Import from skill_map
-# from aggregator import SKILL_TO_CLASS  # (REMOVED)
+from poll_scheduler import AdaptivePollScheduler
 
-def combat_log_worker(reader, parser, aggregator, stop_event):
-    seen_lines = set(reader.get_combat_chat_log())
+log = logging.getLogger(__name__)
+
+def combat_log_worker(reader, parser, aggregator, stop_event, scheduler=None, recorder=None):
+    if scheduler is None:
+        scheduler = AdaptivePollScheduler()
+    encounter_seen = aggregator.encounter_id
     while not stop_event.is_set():
+        poll_started = time.perf_counter()
+        new_lines = None
+        batch = None
+        failed = False
         try:
-            combat_log = reader.get_combat_chat_log()
-            for line in combat_log:
-                line = line.strip()
-                if not line or line in seen_lines:
-                    continue
-                seen_lines.add(line)
-                result = parser.evaluate_combat_log_line(line)
-                if result:
-                    actor, damage, target, skill, critical = result
-                    print(f"[DEBUG] Worker parsed line -> actor: {actor}, skill: {skill}, damage: {damage}")
-                    aggregator.update(actor, damage, critical)
-
-                    # Attempt to guess the class from the skill
-                    guessed_class = SKILL_TO_CLASS.get(skill, None)
-                    if guessed_class:
-                        print(f"[DEBUG] Guessed class {guessed_class} for actor {actor} from skill {skill}")
-                        aggregator.set_actor_class(actor, guessed_class)
-                    else:
-                        print(f"[DEBUG] No class guess for skill '{skill}'")
+            new_lines = reader.get_new_combat_chat_log()
+            batch = parser.parse_batch(new_lines)
+            if len(batch):
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Worker parsed %d hits from %d new lines", len(batch), len(new_lines))
+                # Class guessing from skills happens inside the aggregator
+                aggregator.submit(batch)
+        except Exception as e:
+            log.warning("Error in combat log worker: %s", e)
+            failed = True
 
-            time.sleep(1)
+        # This thread is the aggregator's writer: apply whatever got queued
+        # (including resets from the UI) and publish a new snapshot. Also after
+        # a failed read, so encounters still close when the game goes away.
+        try:
+            aggregator.flush()
+            if recorder is not None:
+                # One recording per encounter, as segmented by the aggregator
+                if aggregator.encounter_id != encounter_seen:
+                    encounter_seen = aggregator.encounter_id
+                    recorder.start_encounter()
+                if batch is not None:
+                    recorder.record(batch)
         except Exception as e:
-            print("Error in combat log worker:", e)
-            time.sleep(5)
+            log.warning("Error publishing combat stats: %s", e)
+            failed = True
+
+        if failed:
+            delay = scheduler.record_error()
+        else:
+            delay = scheduler.record_poll(len(new_lines), time.perf_counter() - poll_started)
+        # Event.wait instead of sleep so shutdown doesn't wait out a long idle interval
+        stop_event.wait(delay)